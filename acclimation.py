@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import time
+import numpy as np
+
+log = logging.getLogger("control")
+
+SCHEDULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "acclimation.npz")
+SCHEDULE_STEP = 600  # Detik per baris tabel setpoint
+SCHEDULE_CHANNELS = ("temp", "hum", "lux")
+DEFAULT_PHOTOPERIOD = 16  # Jam terang per hari (bisa ditimpa "photoperiod" di profil)
+DEFAULT_DAY_START = 6  # Jam lampu menyala (bisa ditimpa "day_start" di profil)
+
+
+def _is_day(times, day_start, photoperiod):
+    """Day/night phase for (arrays of) timestamps, in local time."""
+    hour = ((times + time.localtime().tm_gmtoff) % 86400) / 3600.0
+    return (hour - day_start) % 24 < photoperiod
+
+
+class AcclimationSchedule:
+    """Setpoint trajectory from the conditions at start to a plant profile's targets.
+
+    temp/hum/daytime lux ramp linearly over the acclimation days; lux is 0 outside the
+    photoperiod. The ramp is precomputed as a float32 table with one row per SCHEDULE_STEP,
+    so calling the schedule (ClimateController target) is an index lookup. After the ramp the
+    profile targets hold, still with the day/night light cycle.
+    """
+    def __init__(self, profile_name, target, start, table, step=SCHEDULE_STEP,
+                 day_start=DEFAULT_DAY_START, photoperiod=DEFAULT_PHOTOPERIOD):
+        self.profile_name = profile_name
+        self.target = {name: float(target[name]) for name in SCHEDULE_CHANNELS if name in target}
+        self.start = start
+        self.table = table
+        self.step = step
+        self.day_start = day_start
+        self.photoperiod = photoperiod
+
+    @property
+    def end(self):
+        return self.start + len(self.table) * self.step
+
+    def __call__(self, now):
+        index = int((now - self.start) // self.step)
+        if 0 <= index < len(self.table):
+            row = self.table[index].tolist()
+            return {name: row[i] for i, name in enumerate(SCHEDULE_CHANNELS) if name in self.target}
+        setpoints = dict(self.target)
+        if "lux" in setpoints and not _is_day(now, self.day_start, self.photoperiod):
+            setpoints["lux"] = 0.0
+        return setpoints
+
+    def progress(self, now):
+        """Fraction of the acclimation ramp that has passed (1.0 once the targets hold)."""
+        if not len(self.table):
+            return 1.0
+        return min(max((now - self.start) / (self.end - self.start), 0.0), 1.0)
+
+    def save(self, path=SCHEDULE_PATH):
+        meta = {"profile": self.profile_name, "target": self.target, "start": self.start, "step": self.step,
+                "day_start": self.day_start, "photoperiod": self.photoperiod}
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, table=self.table, meta=np.array(json.dumps(meta)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=SCHEDULE_PATH):
+        """Saved schedule, or None if there is none (or it cannot be read)."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                table = data["table"]
+        except (OSError, ValueError, KeyError) as e:
+            log.error("Jadwal aklimatisasi rusak %s: %s", path, e)
+            return None
+        return cls(meta["profile"], meta["target"], meta["start"], table, meta["step"],
+                   meta["day_start"], meta["photoperiod"])
+
+    @staticmethod
+    def clear(path=SCHEDULE_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def build_schedule(profile_name, profile, current, days, start=None, step=SCHEDULE_STEP):
+    """Precompute the acclimation ramp from `current` conditions (missing values start at the target)."""
+    start = time.time() if start is None else start
+    day_start = profile.get("day_start", DEFAULT_DAY_START)
+    photoperiod = profile.get("photoperiod", DEFAULT_PHOTOPERIOD)
+    target = {name: float(profile[name]) for name in SCHEDULE_CHANNELS if profile.get(name) is not None}
+    current = current or {}
+    # Kanal tanpa data sensor mulai langsung dari target; kanal tanpa target tidak diatur (NaN di tabel)
+    goal = np.array([target.get(name, np.nan) for name in SCHEDULE_CHANNELS])
+    initial = np.array([current[name] if current.get(name) is not None else goal[i]
+                        for i, name in enumerate(SCHEDULE_CHANNELS)], dtype=float)
+    rows = int(round(days * 86400 / step))
+    times = start + np.arange(rows) * step
+    fraction = (np.arange(rows) + 1) / max(rows, 1)  # Baris terakhir sudah tepat di target
+    table = initial + np.outer(fraction, goal - initial)
+    lux = SCHEDULE_CHANNELS.index("lux")
+    table[:, lux] = np.where(_is_day(times, day_start, photoperiod), table[:, lux], 0.0)
+    return AcclimationSchedule(profile_name, target, start, table.astype(np.float32), step, day_start, photoperiod)
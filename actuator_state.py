@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import time
+from PySide6.QtCore import QObject, QTimer, Signal
+from serial_protocol import ACTUATOR_COMMANDS, parse_actuator_command
+
+log = logging.getLogger("serial")
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+STATUS_REQUEST = "Q\n"
+STATUS_PREFIX = "ACT"  # Balasan Q: "ACT P255 R255 D0 ... AC1"
+ACK_PREFIX = "OK "  # Balasan perintah aktuator: "OK G128"
+RECONCILE_MS = 30000  # Interval cek status aktuator ke board
+RECONCILE_GRACE = 2.0  # Detik; perintah baru belum tentu sudah diproses board, jangan dikirim ulang
+STATUS_MAX_FAILURES = 3  # Q gagal berturut-turut sebanyak ini: board dianggap tidak mendukung status
+
+
+def parse_status(line):
+    """{code: value} from an "ACT ..." status line."""
+    states = {}
+    for token in line[len(STATUS_PREFIX):].split():
+        parsed = parse_actuator_command(token)
+        if parsed is not None:
+            states[parsed[0]] = parsed[1]
+    return states
+
+
+class ActuatorState(QObject):
+    """What the app wants each actuator to be (desired) and what the board last reported (reported).
+
+    desired holds only what was commanded in this session (Manual page or controller);
+    reported follows "OK <cmd>" acknowledgements and the bulk status reply to Q.
+    reconcile() asks for the status once (on connect and every RECONCILE_MS) and then resends
+    only the commanded actuators whose reported value differs from the desired one.
+    defaults are the Manual values from config.json: they only seed the Manual controls and
+    change only through set_default() (user action), so controller outputs are never saved.
+    """
+    changed = Signal(str, int)  # (kode, nilai) yang dilaporkan board
+
+    def __init__(self, send, request, config_path=CONFIG_PATH):
+        super().__init__()
+        self.send = send
+        self.request = request
+        self.config_path = config_path
+        self.desired = {}
+        self.reported = {}
+        self.defaults = {}
+        self.queue = None  # serial_protocol.CommandQueue worker aktif
+        self._sent_at = {}
+        self._status_request_id = None
+        self.supports_status = True
+        self._status_failures = 0
+        self._defaults_changed = False
+        self.load_config()
+        self.timer = QTimer(self)
+        self.timer.setInterval(RECONCILE_MS)
+        self.timer.timeout.connect(self.reconcile)
+
+    def load_config(self):
+        try:
+            with open(self.config_path, "r") as f:
+                config = json.load(f)
+        except Exception as e:
+            log.error("Error loading actuator config: %s", e)
+            return
+        for item in config.get("sliders", {}).values():
+            self.defaults[item["command"]] = int(item.get("value", 0))
+        for item in config.get("toggles", {}).values():
+            self.defaults[item["command"]] = int(bool(item.get("state", False)))
+
+    def save_config(self):
+        """Write the Manual defaults back into the slider/toggle entries of config.json (only if they changed)."""
+        if not self._defaults_changed:
+            return
+        try:
+            with open(self.config_path, "r") as f:
+                config = json.load(f)
+            for item in config.get("sliders", {}).values():
+                if item["command"] in self.defaults:
+                    item["value"] = self.defaults[item["command"]]
+            for item in config.get("toggles", {}).values():
+                if item["command"] in self.defaults:
+                    item["state"] = bool(self.defaults[item["command"]])
+            tmp = self.config_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(config, f, indent=4, ensure_ascii=False)
+            os.replace(tmp, self.config_path)
+            self._defaults_changed = False
+        except Exception as e:
+            log.error("Gagal menyimpan status aktuator: %s", e)
+
+    def value(self, code):
+        """Best known value: what the board reported, else what the app last asked for, else the Manual default."""
+        return self.reported.get(code, self.desired.get(code, self.defaults.get(code, 0)))
+
+    def set_default(self, code, value):
+        """Value chosen on the Manual page; saved to config.json as the next start value."""
+        if self.defaults.get(code) != value:
+            self.defaults[code] = value
+            self._defaults_changed = True
+
+    def note_sent(self, code, value):
+        self.desired[code] = value
+        self._sent_at[code] = time.monotonic()
+
+    def attach(self, worker):
+        """New connection: nothing is known about the board yet; the status query fills it in."""
+        self.queue = worker.commands if worker is not None else None
+        self.reported.clear()
+        self._status_request_id = None
+        if worker is None:
+            self.timer.stop()
+            return
+        self.supports_status = True
+        self._status_failures = 0
+        self.reconcile()
+        self.timer.start()
+
+    def reconcile(self):
+        if self.supports_status and self._status_request_id is None:
+            self._status_request_id = self.request(STATUS_REQUEST, expect="line", prefix=STATUS_PREFIX)
+
+    def handle_line(self, line):
+        """Acknowledgements "OK <code><value>" from the board (any line is offered)."""
+        if line.startswith(ACK_PREFIX):
+            parsed = parse_actuator_command(line[len(ACK_PREFIX):])
+            if parsed is not None:
+                self._report({parsed[0]: parsed[1]})
+
+    def handle_response(self, request_id, payload):
+        if request_id != self._status_request_id:
+            return
+        self._status_request_id = None
+        self._status_failures = 0
+        self._report(parse_status(payload.get("line", "")))
+        now = time.monotonic()
+        # Hanya aktuator yang diperintah sesi ini dan berbeda dikirim ulang (mis. board baru reset);
+        # sisanya mengikuti laporan board, tidak ada yang dinyalakan tanpa perintah
+        for code, value in list(self.desired.items()):
+            if code in self.reported and self.reported[code] != value and now - self._sent_at[code] > RECONCILE_GRACE:
+                log.info("Aktuator %s di board %d, diset ulang ke %d", code, self.reported[code], value)
+                self.send(f"{code}{value}\n")
+
+    def handle_failed(self, request_id, message):
+        if request_id != self._status_request_id:
+            return
+        self._status_request_id = None
+        self._status_failures += 1
+        # Gangguan sesaat: dicoba lagi pada siklus berikutnya; hanya gagal beruntun yang mematikan rekonsiliasi
+        if self._status_failures < STATUS_MAX_FAILURES:
+            log.warning("Status aktuator (Q) tidak dibalas (%d/%d), dicoba lagi nanti.",
+                        self._status_failures, STATUS_MAX_FAILURES)
+            return
+        self.supports_status = False
+        self.timer.stop()
+        log.info("Board tidak mendukung status aktuator (Q); status hanya dari konfirmasi perintah.")
+
+    def _report(self, states):
+        for code, value in states.items():
+            if code not in ACTUATOR_COMMANDS:
+                continue
+            if self.reported.get(code) != value:
+                self.reported[code] = value
+                self.changed.emit(code, value)
+        # Nilai yang sudah berlaku di board tidak perlu ditulis lagi oleh antrian perintah
+        if self.queue is not None:
+            self.queue.confirm(states)
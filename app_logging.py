@@ -0,0 +1,77 @@
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from collections import deque
+
+LOG_FORMAT = "%(asctime)s [%(name)s] %(message)s"
+LOG_DATEFMT = "%H:%M:%S"
+LOG_LEVEL = logging.INFO
+# Level per modul (nama logger); trafik per-baris serial/MQTT ada di DEBUG agar jalur panas tidak memformat apa pun
+MODULE_LEVELS = {
+    "serial": logging.INFO,
+    "sensors": logging.INFO,
+    "mqtt": logging.INFO,
+}
+PANEL_BACKLOG = 5000  # Record yang menunggu panel; yang tertua dibuang jika GUI tertinggal
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+LOG_FILE_BYTES = 1024 * 1024  # Ukuran per file log sebelum dirotasi
+LOG_FILE_BACKUPS = 5
+
+
+class PanelHandler(logging.Handler):
+    """Collects formatted records for the dashboard log panel; the GUI thread drains them in batches."""
+    def __init__(self, maxlen=PANEL_BACKLOG):
+        super().__init__()
+        self._records = deque(maxlen=maxlen)
+
+    def emit(self, record):
+        self._records.append((record.levelno, self.format(record)))
+
+    def drain(self):
+        """Return and forget every pending (levelno, line) pair."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._records.popleft())
+            except IndexError:
+                return batch
+
+
+panel_handler = PanelHandler()
+_listener = None
+
+
+def setup_logging(level=LOG_LEVEL, module_levels=MODULE_LEVELS):
+    """Route all records through a queue; a listener thread formats them for the console and the panel."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    formatter = logging.Formatter(LOG_FORMAT, LOG_DATEFMT)
+    console = logging.StreamHandler(sys.__stdout__)
+    console.setFormatter(formatter)
+    panel_handler.setFormatter(formatter)
+    # Panel hanya menyimpan N baris terakhir; riwayat lengkap ada di file yang dirotasi
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = logging.handlers.RotatingFileHandler(
+        os.path.join(LOG_DIR, "system.log"), maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+    )
+    log_file.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    logging.captureWarnings(True)
+    _listener = logging.handlers.QueueListener(log_queue, console, log_file, panel_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush pending records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
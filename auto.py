@@ -2,11 +2,18 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QComboBox,
     QFrame, QLineEdit, QSpacerItem, QSizePolicy
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, Signal, Slot
 from PySide6.QtGui import QFont, QIntValidator
 from slide_switch import SlideSwitch
+from settings import Settings
+from climate_control import ClimateController, MEASUREMENT_LABEL
+from acclimation import AcclimationSchedule, build_schedule
 import json
+import logging
 import os
+import time
+
+log = logging.getLogger("auto")
 
 
 # -------------------------
@@ -124,6 +131,8 @@ class CustomLineEdit(QLineEdit):
 # Main Auto panel
 # -------------------------
 class Auto(QWidget):
+    command_requested = Signal(str, int)  # (perintah, generation ClimateController) dari thread kontrol
+
     def __init__(self):
         super().__init__()
         self.setObjectName("menu-box")
@@ -179,9 +188,10 @@ class Auto(QWidget):
         # Mode row
         mode_label = QLabel("Mode Kontrol:")
         mode_label.setFont(QFont("", 10, QFont.Bold))
-        mode_switch = AutoModeSwitch()
+        self.mode_switch = AutoModeSwitch()
+        self.mode_switch.toggled.connect(self.handle_mode_changed)
         controls_col.addWidget(mode_label)
-        controls_col.addWidget(mode_switch)
+        controls_col.addWidget(self.mode_switch)
         # Plant profile row
         plant_label = QLabel("Plant Profile:")
         plant_label.setFont(QFont("", 10, QFont.Bold))
@@ -216,6 +226,10 @@ class Auto(QWidget):
         controls_col.addWidget(start_btn)
         self.start_btn = start_btn  # Save reference for slot
         start_btn.clicked.connect(self.handle_start_process)
+        self.control_status = QLabel(f"Kontrol (sensor {MEASUREMENT_LABEL}): berhenti")
+        self.control_status.setObjectName("auto-control-status")
+        self.control_status.setStyleSheet("color:#b0bec5;font-size:12px;")
+        controls_col.addWidget(self.control_status)
         # --- RIGHT CARD: Profile Info ---
         self.profile_info_box = QFrame()
         self.profile_info_box.setObjectName("profile-info-box")
@@ -311,6 +325,15 @@ class Auto(QWidget):
         self.plant_dropdown.addItems(list(self.plant_profiles.keys()))
         self.plant_dropdown.currentTextChanged.connect(self._update_profile_info)
         self._update_profile_info(self.plant_dropdown.currentText())
+        # Mesin kontrol berjalan di thread sendiri; halaman ini hanya start/stop dan status
+        # Perintah dari thread kontrol diteruskan lewat signal: dijalankan di thread GUI (queued)
+        self.command_requested.connect(self.send_command)
+        self.controller = ClimateController(lambda cmd: self.command_requested.emit(cmd, self.controller.generation),
+                                            Settings.is_connected)
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_control_status)
+        self.schedule = None
+        self.resume_schedule()
 
     def _load_plant_profiles(self):
         self.plant_profiles = {}
@@ -320,7 +343,7 @@ class Auto(QWidget):
                 with open(json_path, "r") as f:
                     self.plant_profiles = json.load(f)
             except Exception as e:
-                print(f"Error loading plant profiles: {e}")
+                log.error("Error loading plant profiles: %s", e)
         if not self.plant_profiles:
             # Default profiles if file not found or empty
             self.plant_profiles = {
@@ -363,11 +386,68 @@ class Auto(QWidget):
             label.setTextFormat(Qt.RichText)
 
     def handle_start_process(self):
-        self.start_btn.setEnabled(False)
-        self.start_btn.setText("Processing...")
-        from PySide6.QtCore import QTimer
-        QTimer.singleShot(5000, self.reset_start_button)
+        """Start/stop the climate controller on an acclimation schedule towards the selected profile."""
+        if self.controller.is_running():
+            self.controller.stop()
+            AcclimationSchedule.clear()  # Dihentikan pengguna: tidak dilanjutkan saat start ulang
+            self.schedule = None
+        elif not self.mode_switch.isChecked():
+            self.control_status.setText("Kontrol: pilih mode Automated dulu")
+            return
+        else:
+            name = self.plant_dropdown.currentText()
+            days = int(self.accl_input.text() or 0)
+            # Setpoint bergerak dari kondisi sekarang ke target profil selama masa aklimatisasi
+            self.schedule = build_schedule(name, self.plant_profiles.get(name, {}), self.controller.latest(), days)
+            try:
+                self.schedule.save()
+            except OSError as e:
+                log.error("Gagal menyimpan jadwal aklimatisasi: %s", e)
+            self.controller.start(self.schedule)
+        self.update_control_status()
+
+    def handle_mode_changed(self, automated):
+        if not automated and self.controller.is_running():
+            self.handle_start_process()
+
+    def resume_schedule(self):
+        """Continue an acclimation run that was active when the app stopped."""
+        self.schedule = AcclimationSchedule.load()
+        if self.schedule is None:
+            return
+        if self.schedule.profile_name in self.plant_profiles:
+            self.plant_dropdown.setCurrentText(self.schedule.profile_name)
+        self.accl_input.setText(str(round((self.schedule.end - self.schedule.start) / 86400)))
+        self.mode_switch.setChecked(True)
+        self.controller.start(self.schedule)
+        log.info("Aklimatisasi %s dilanjutkan (%.0f%%)", self.schedule.profile_name,
+                 self.schedule.progress(time.time()) * 100)
+        self.update_control_status()
+
+    def update_control_status(self):
+        running = self.controller.is_running()
+        self.start_btn.setText("Stop Process" if running else "Start Process")
+        self.plant_dropdown.setEnabled(not running)
+        if not running:
+            self.control_status.setText(f"Kontrol (sensor {MEASUREMENT_LABEL}): berhenti")
+            return
+        jitter = self.controller.jitter
+        progress = f"aklimatisasi {self.schedule.progress(time.time()) * 100:.0f}%, " if self.schedule else ""
+        self.control_status.setText(f"Kontrol (sensor {MEASUREMENT_LABEL}): {progress}jitter {jitter['mean_ms']:.1f}/{jitter['max_ms']:.1f} ms, "
+                                    f"terlewat {jitter['overruns']}")
+
+    def page_shown(self):
+        self.update_control_status()
+        self.status_timer.start(1000)
+
+    def page_hidden(self):
+        self.status_timer.stop()
+
+    @Slot(str, int)
+    def send_command(self, cmd, generation):
+        # Perintah tick yang tiba setelah stop() (masih di antrian event) dibuang
+        if generation == self.controller.generation:
+            Settings.send_command(cmd)
 
-    def reset_start_button(self):
-        self.start_btn.setEnabled(True)
-        self.start_btn.setText("Start Process")
+    def cleanup(self):
+        self.controller.stop()
@@ -1,67 +1,347 @@
+import glob
+import json
+import logging
+import os
+import queue
+import sys
+import threading
 import cv2
-from PySide6.QtCore import QThread, Signal, QObject, Qt
+import numpy as np
+from PySide6.QtCore import QThreadPool, Signal, QObject, Qt, QTimer
 from PySide6.QtGui import QImage, QPixmap
-from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QFrame, QPushButton
+from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QGridLayout, QFrame, QPushButton
+from camera_recorder import FrameRecorder
+from plant_vision import CanopyAnalyzer
+
+log = logging.getLogger("camera")
+
+FRAME_POOL_SIZE = 3  # Buffer frame per kamera; jika semua dipegang GUI, frame baru dilewati
+CAMERA_DISPLAY_FPS = 30  # Laju GUI mengambil frame terbaru dari mailbox
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+CAMERA_CACHE_PATH = os.path.join(BASE_DIR, "camera_cache.json")  # Hasil probe terakhir, dipakai ulang saat startup
+MAX_PROBE_INDEX = 4  # Platform tanpa /dev/video*: indeks 0..3 yang diprobe
+CAMERA_POOL_THREADS = 6  # Thread bersama untuk semua feed kamera + probe
+GRID_COLUMNS = 2
+
+# Profil capture bawaan; ditimpa "cameras.default" lalu "cameras.<index>" di config.json
+DEFAULT_CAPTURE_PROFILE = {
+    "backend": "auto",  # auto | v4l2 | gstreamer | dshow | msmf | any
+    "width": 640,
+    "height": 480,
+    "fps": 30,
+    "fourcc": "MJPG",  # MJPG | YUYV | "" (biarkan default driver)
+    "buffer_size": 1,  # Satu frame di driver: selalu frame terbaru, latensi minimal
+    "pipeline": "",  # Khusus gstreamer; "{index}" diganti nomor kamera
+    "timelapse_minutes": 10,  # Interval time-lapse
+    "analysis_interval": 5,  # Detik antar analisis kanopi; 0 = nonaktif
+    "field_area_cm2": 0,  # Luas area yang terlihat kamera, untuk estimasi luas daun; 0 = tidak diketahui
+}
+BACKENDS = {
+    "v4l2": cv2.CAP_V4L2,
+    "gstreamer": cv2.CAP_GSTREAMER,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+    "any": cv2.CAP_ANY,
+}
+
+
+def load_camera_profile(index):
+    """Capture profile for a camera index, merged from the defaults and config.json."""
+    cameras = {}
+    if os.path.exists(CONFIG_PATH):
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                cameras = json.load(f).get("cameras", {})
+        except Exception as e:
+            log.error("Error loading camera profiles: %s", e)
+    return {**DEFAULT_CAPTURE_PROFILE, **cameras.get("default", {}), **cameras.get(str(index), {})}
+
+
+def resolve_backend(name):
+    """Map a profile backend name to a cv2 constant; "auto" picks the native backend of the platform."""
+    if name == "auto":
+        if sys.platform.startswith("linux"):
+            return cv2.CAP_V4L2
+        if sys.platform == "win32":
+            return cv2.CAP_DSHOW
+        return cv2.CAP_ANY
+    return BACKENDS.get(name, cv2.CAP_ANY)
+
+
+class FramePool:
+    """Fixed set of reusable frame buffers: the worker acquires one per frame, the GUI releases it after display."""
+    def __init__(self, size=FRAME_POOL_SIZE):
+        self._free = queue.SimpleQueue()
+        for _ in range(size):
+            self._free.put(None)  # Dialokasikan saat pertama dipakai (ukuran belum diketahui)
+
+    def acquire(self, shape):
+        """Return a uint8 buffer of the given shape, or None if every buffer is still owned by the GUI."""
+        try:
+            buf = self._free.get_nowait()
+        except queue.Empty:
+            return None
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def release(self, buf):
+        self._free.put(buf)
+
+
+class FrameMailbox:
+    """Single-slot, latest-frame-wins handoff from a camera worker to the GUI.
+
+    put() overwrites an unread frame (its buffer goes back to the pool and counts as dropped);
+    take() returns the newest (image, buffer) or None. Nothing queues up while the GUI is busy.
+    """
+    def __init__(self, pool):
+        self.pool = pool
+        self.dropped = 0
+        self._slot = None
+        self._lock = threading.Lock()
+
+    def put(self, image, buffer):
+        with self._lock:
+            previous, self._slot = self._slot, (image, buffer)
+        if previous is not None:
+            self.dropped += 1
+            self.pool.release(previous[1])
+
+    def take(self):
+        with self._lock:
+            item, self._slot = self._slot, None
+        return item
+
+
+def list_video_nodes():
+    """Indices of /dev/video* nodes on Linux, or None where cameras have no device nodes."""
+    if not sys.platform.startswith("linux"):
+        return None
+    indices = []
+    for path in glob.glob("/dev/video*"):
+        suffix = path[len("/dev/video"):]
+        if suffix.isdigit():
+            indices.append(int(suffix))
+    return sorted(indices)
+
+
+def probe_camera(index):
+    """True if the camera opens with its configured backend and delivers a frame."""
+    cap = cv2.VideoCapture(index, resolve_backend(load_camera_profile(index)["backend"]))
+    try:
+        return cap.isOpened() and cap.grab()
+    finally:
+        cap.release()
+
+
+class CameraRegistry(QObject):
+    """Finds usable cameras off the GUI thread; the probe result is cached until the device nodes change."""
+    cameras_found = Signal(list)  # Indeks kamera yang bisa dibuka, terurut
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def scan(self, force=False, busy=()):
+        """Emit cameras_found, from the cache when still valid, otherwise after probing on the pool.
+
+        Cameras in busy are already streaming and are reported without being reopened.
+        """
+        nodes = list_video_nodes()
+        cached = self._load_cache()
+        if not force and cached is not None and cached.get("nodes") == nodes:
+            self.cameras_found.emit(cached["cameras"])
+            return
+        self.pool.start(lambda: self._probe(nodes, set(busy)))
+
+    def _probe(self, nodes, busy):
+        candidates = nodes if nodes is not None else range(MAX_PROBE_INDEX)
+        found = [index for index in candidates if index in busy or probe_camera(index)]
+        log.info("Kamera ditemukan: %s", found or "tidak ada")
+        try:
+            with open(CAMERA_CACHE_PATH, "w") as f:
+                json.dump({"nodes": nodes, "cameras": found}, f)
+        except OSError as e:
+            log.warning("Gagal menyimpan cache kamera: %s", e)
+        self.cameras_found.emit(found)
+
+    def _load_cache(self):
+        if not os.path.exists(CAMERA_CACHE_PATH):
+            return None
+        try:
+            with open(CAMERA_CACHE_PATH, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
 
 class CameraWorker(QObject):
-    frame_ready = Signal(int, QImage)
     camera_error = Signal(int, str)
+    canopy_measured = Signal(int, dict)  # (index, metrik kanopi); dari thread analyzer
 
-    def __init__(self, camera_index):
+    def __init__(self, camera_index, profile=None):
         super().__init__()
         self.camera_index = camera_index
+        self.profile = profile or load_camera_profile(camera_index)
         self._is_running = False
         self.cap = None
+        self.pool = FramePool()
+        self.mailbox = FrameMailbox(self.pool)
+        self.captured = 0
+        self.finished = threading.Event()  # Diset saat loop selesai dan device dilepas
+        self.recorder = FrameRecorder(camera_index, fps=self.profile["fps"] or 30.0)
+        self.analyzer = CanopyAnalyzer(
+            lambda metrics: self.canopy_measured.emit(self.camera_index, metrics),
+            interval=self.profile["analysis_interval"], field_area_cm2=self.profile["field_area_cm2"],
+        )
+        self.target_size = None  # (w, h) label tujuan; frame diskalakan sekali di thread ini
+
+    def set_target_size(self, width, height):
+        self.target_size = (width, height)
 
     def run(self):
+        try:
+            self._capture_loop()
+        finally:
+            self.recorder.close()
+            self.analyzer.close()
+            self.finished.set()
+
+    def is_running(self):
+        return self._is_running and not self.finished.is_set()
+
+    def _capture_loop(self):
         self._is_running = True
-        print(f"Starting camera worker for index: {self.camera_index}")
-        backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
-        for backend in backends:
-            self.cap = cv2.VideoCapture(self.camera_index, backend)
-            if self.cap.isOpened():
-                break
-        
+        log.info("Starting camera worker for index: %d", self.camera_index)
+        self.cap = self._open()
         if not self.cap or not self.cap.isOpened():
             self.camera_error.emit(self.camera_index, "Cannot open camera")
             self._is_running = False
             return
 
+        frame = None
         while self._is_running:
-            ret, frame = self.cap.read()
+            # read() mengisi ulang buffer capture yang sama bila ukurannya cocok
+            ret, frame = self.cap.read(frame)
             if not ret:
                 self.camera_error.emit(self.camera_index, "No Signal")
                 break
-            rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            self.frame_ready.emit(self.camera_index, qt_image.copy())
+            self.captured += 1
+            # Rekaman memakai frame resolusi penuh; encoding di thread recorder
+            self.recorder.offer(frame)
+            self.analyzer.offer(frame)
+            h, w, ch = frame.shape
+            width, height = self.target_size or (w, h)
+            buf = self.pool.acquire((height, width, ch))
+            if buf is None:
+                self.mailbox.dropped += 1
+                continue
+            if (width, height) == (w, h):
+                np.copyto(buf, frame)
+            else:
+                cv2.resize(frame, (width, height), dst=buf, interpolation=cv2.INTER_AREA)
+            # QImage membungkus buffer pool tanpa salinan; data BGR OpenCV dipakai langsung
+            qt_image = QImage(buf.data, width, height, ch * width, QImage.Format_BGR888)
+            self.mailbox.put(qt_image, buf)
 
         if self.cap:
             self.cap.release()
-        print(f"Stopping camera worker for index: {self.camera_index}")
+        log.info("Stopping camera worker for index: %d", self.camera_index)
 
     def stop(self):
         self._is_running = False
 
+    def _open(self):
+        """Open with the configured backend only; CAP_ANY is the single fallback."""
+        profile = self.profile
+        backend = resolve_backend(profile["backend"])
+        if backend == cv2.CAP_GSTREAMER and profile["pipeline"]:
+            cap = cv2.VideoCapture(profile["pipeline"].format(index=self.camera_index), cv2.CAP_GSTREAMER)
+        else:
+            cap = cv2.VideoCapture(self.camera_index, backend)
+        if not cap.isOpened() and backend != cv2.CAP_ANY:
+            log.warning("Kamera %d: backend '%s' gagal, mencoba CAP_ANY", self.camera_index, profile["backend"])
+            cap = cv2.VideoCapture(self.camera_index, cv2.CAP_ANY)
+        if not cap.isOpened():
+            return cap
+        # Format piksel harus diset sebelum resolusi (V4L2 menegosiasikan keduanya bersamaan)
+        if profile["fourcc"]:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile["fourcc"]))
+        if profile["width"] and profile["height"]:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, profile["width"])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, profile["height"])
+        if profile["fps"]:
+            cap.set(cv2.CAP_PROP_FPS, profile["fps"])
+        if profile["buffer_size"]:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, profile["buffer_size"])
+        log.info("Kamera %d: %dx%d @ %.0f fps (%s)", self.camera_index,
+                 cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+                 cap.get(cv2.CAP_PROP_FPS), cap.getBackendName())
+        return cap
+
+
 class Camera(QWidget):
+    canopy_measured = Signal(int, dict)
+
     def __init__(self):
         super().__init__()
-        # ... (sisa __init__ Anda tidak berubah)
         self.setObjectName("main-menu-container")
         main_layout = QVBoxLayout(self)
-        self.camera_grid_layout = QHBoxLayout()
+        toolbar = QHBoxLayout()
+        self.scan_button = QPushButton("Pindai Kamera")
+        self.scan_button.clicked.connect(lambda: self.scan_cameras(force=True))
+        toolbar.addWidget(self.scan_button)
+        toolbar.addStretch()
+        main_layout.addLayout(toolbar)
+        self.camera_grid_layout = QGridLayout()
         main_layout.addLayout(self.camera_grid_layout)
-        self.threads = {}
+        main_layout.addStretch()
+        self.frames = {}
         self.workers = {}
         self.labels = {}
         self.buttons = {}
-        self.add_camera_frame(0, "Kamera 1")
-        self.add_camera_frame(1, "Kamera 2")
+        self.stats_labels = {}
+        self.record_buttons = {}
+        self.displayed = {}
+        self.canopy = {}  # Metrik kanopi terakhir per kamera
+        # Satu pool untuk semua feed, bukan satu QThread per toggle
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(CAMERA_POOL_THREADS)
+        self.registry = CameraRegistry(self.pool)
+        self.registry.cameras_found.connect(self.build_camera_grid)
+        # GUI menarik frame terbaru sendiri; timer hanya jalan saat halaman tampil (page_shown)
+        self.display_timer = QTimer(self)
+        self.display_timer.timeout.connect(self.update_frames)
+        self.display_timer.setInterval(1000 // CAMERA_DISPLAY_FPS)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.setInterval(1000)
+        self.scan_cameras()
+
+    def scan_cameras(self, force=False):
+        self.scan_button.setEnabled(False)
+        busy = [index for index, worker in self.workers.items() if worker.is_running()]
+        self.registry.scan(force=force, busy=busy)
+
+    def build_camera_grid(self, indices):
+        """Add a feed for every newly found camera and drop idle feeds whose device disappeared."""
+        self.scan_button.setEnabled(True)
+        for index in list(self.frames):
+            if index not in indices and not (index in self.workers and self.workers[index].is_running()):
+                self.frames.pop(index).deleteLater()
+                for widgets in (self.labels, self.buttons, self.stats_labels, self.record_buttons):
+                    widgets.pop(index, None)
+        for index in indices:
+            if index not in self.frames:
+                self.add_camera_frame(index, f"Kamera {index}")
+        for frame in self.frames.values():
+            self.camera_grid_layout.removeWidget(frame)
+        for position, index in enumerate(sorted(self.frames)):
+            self.camera_grid_layout.addWidget(self.frames[index], position // GRID_COLUMNS, position % GRID_COLUMNS)
 
     def add_camera_frame(self, index, title):
-        # ... (fungsi ini tidak berubah)
         frame = QFrame()
         frame.setFrameShape(QFrame.StyledPanel)
         frame.setFixedSize(420, 340)
@@ -69,56 +349,138 @@ class Camera(QWidget):
         camera_label = QLabel(f"{title}\n(Nonaktif)")
         camera_label.setAlignment(Qt.AlignCenter)
         camera_label.setObjectName("menu-box")
-        camera_label.setScaledContents(True)
+        # Frame sudah diskalakan ke ukuran label di worker
+        camera_label.setScaledContents(False)
         frame_layout.addWidget(camera_label)
+        stats_label = QLabel("")
+        stats_label.setAlignment(Qt.AlignCenter)
+        frame_layout.addWidget(stats_label)
         button = QPushButton("Aktifkan")
         button.setCheckable(True)
         button.toggled.connect(lambda checked: self.toggle_camera(index, checked))
         frame_layout.addWidget(button)
-        self.camera_grid_layout.addWidget(frame)
+        record_row = QHBoxLayout()
+        record_button = QPushButton("Rekam")
+        record_button.setCheckable(True)
+        record_button.toggled.connect(lambda checked: self.toggle_recording(index, checked))
+        timelapse_button = QPushButton("Time-lapse")
+        timelapse_button.setCheckable(True)
+        timelapse_button.toggled.connect(lambda checked: self.toggle_timelapse(index, checked))
+        snapshot_button = QPushButton("Snapshot")
+        snapshot_button.clicked.connect(lambda: self.take_snapshot(index))
+        for widget in (record_button, timelapse_button, snapshot_button):
+            widget.setEnabled(False)
+            record_row.addWidget(widget)
+        frame_layout.addLayout(record_row)
+        self.record_buttons[index] = (record_button, timelapse_button, snapshot_button)
+        self.frames[index] = frame
         self.labels[index] = camera_label
+        self.stats_labels[index] = stats_label
         self.buttons[index] = button
 
     def toggle_camera(self, index, is_checked):
-        # ... (fungsi ini tidak berubah)
         if is_checked:
+            previous = self.workers.get(index)
+            if previous is not None:
+                # Device harus dilepas worker lama sebelum dibuka lagi
+                previous.stop()
+                previous.finished.wait(2.0)
             self.buttons[index].setText("Nonaktifkan")
             self.labels[index].setText("Menghubungkan...")
-            self.threads[index] = QThread()
-            self.workers[index] = CameraWorker(camera_index=index)
-            self.workers[index].moveToThread(self.threads[index])
-            self.threads[index].started.connect(self.workers[index].run)
-            self.workers[index].frame_ready.connect(self.update_frame)
-            self.workers[index].camera_error.connect(self.handle_camera_error)
-            self.threads[index].start()
+            worker = CameraWorker(camera_index=index)
+            worker.set_target_size(self.labels[index].width(), self.labels[index].height())
+            worker.camera_error.connect(self.handle_camera_error)
+            worker.canopy_measured.connect(self.handle_canopy_measured)
+            self.workers[index] = worker
+            self.displayed[index] = 0
+            self.pool.start(worker.run)
+            for widget in self.record_buttons[index]:
+                widget.setEnabled(True)
         else:
             if index in self.workers:
                 self.workers[index].stop()
-                self.threads[index].quit()
-                self.threads[index].wait()
                 self.buttons[index].setText("Aktifkan")
-                self.labels[index].setText(f"Kamera {index + 1}\n(Nonaktif)")
+                self.labels[index].setText(f"Kamera {index}\n(Nonaktif)")
                 self.labels[index].setPixmap(QPixmap())
+                self.stats_labels[index].setText("")
+                for widget in self.record_buttons[index]:
+                    widget.setEnabled(False)
+                    if widget.isCheckable():
+                        widget.setChecked(False)
 
-    def update_frame(self, index, image):
-        # ... (fungsi ini tidak berubah)
-        if index in self.labels:
-            pixmap = QPixmap.fromImage(image)
-            self.labels[index].setPixmap(pixmap)
+    def toggle_recording(self, index, is_checked):
+        worker = self.workers.get(index)
+        if worker is None:
+            return
+        if is_checked:
+            worker.recorder.start_recording()
+        else:
+            worker.recorder.stop_recording()
+
+    def toggle_timelapse(self, index, is_checked):
+        worker = self.workers.get(index)
+        if worker is None:
+            return
+        worker.recorder.set_timelapse(worker.profile["timelapse_minutes"] * 60 if is_checked else None)
+
+    def take_snapshot(self, index):
+        worker = self.workers.get(index)
+        if worker is not None and worker.is_running():
+            worker.recorder.snapshot()
+
+    def update_frames(self):
+        """Display tick: show the newest frame of every running camera, if a new one arrived."""
+        for index, worker in self.workers.items():
+            if not worker.is_running() or index not in self.labels:
+                continue
+            item = worker.mailbox.take()
+            if item is None:
+                continue
+            image, buffer = item
+            self.labels[index].setPixmap(QPixmap.fromImage(image))
+            # QPixmap sudah punya salinan sendiri; buffer kembali ke worker
+            worker.pool.release(buffer)
+            self.displayed[index] += 1
+
+    def update_stats(self):
+        for index, worker in self.workers.items():
+            if worker.is_running() and index in self.stats_labels:
+                self.stats_labels[index].setText(
+                    f"Captured {worker.captured} · Displayed {self.displayed[index]} · Dropped {worker.mailbox.dropped}"
+                    + (" · REC" if worker.recorder.recording else "")
+                    + self.format_canopy(index)
+                )
+
+    def handle_canopy_measured(self, index, metrics):
+        self.canopy[index] = metrics
+        self.canopy_measured.emit(index, metrics)
+
+    def format_canopy(self, index):
+        metrics = self.canopy.get(index)
+        if metrics is None:
+            return ""
+        return f"\nHijau {metrics['green_coverage']:.0%} · Kuning {metrics['yellow_ratio']:.0%}"
+
+    def page_shown(self):
+        # Frame di mailbox sudah yang terbaru: satu tick langsung mengejar
+        self.update_frames()
+        self.update_stats()
+        self.display_timer.start()
+        self.stats_timer.start()
+
+    def page_hidden(self):
+        self.display_timer.stop()
+        self.stats_timer.stop()
 
     def handle_camera_error(self, index, message):
-        # ... (fungsi ini tidak berubah)
         if index in self.buttons:
             self.buttons[index].setChecked(False)
-            self.labels[index].setText(f"Kamera {index + 1}\nError: {message}")
+            self.labels[index].setText(f"Kamera {index}\nError: {message}")
         self.toggle_camera(index, False)
 
-    # --- FUNGSI BARU YANG HILANG ---
     def cleanup(self):
-        """Fungsi baru untuk memastikan semua thread kamera berhenti dengan aman."""
-        print("Membersihkan thread kamera...")
-        for index in self.workers:
-            if index in self.threads and self.threads[index].isRunning():
-                self.workers[index].stop()
-                self.threads[index].quit()
-                self.threads[index].wait() # Tunggu hingga thread benar-benar berhenti
\ No newline at end of file
+        """Hentikan semua feed kamera dan tunggu device dilepas."""
+        log.info("Membersihkan thread kamera...")
+        for worker in self.workers.values():
+            worker.stop()
+        self.pool.waitForDone()
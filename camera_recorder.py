@@ -0,0 +1,131 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import cv2
+
+log = logging.getLogger("camera")
+
+RECORD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+RECORD_QUEUE_SIZE = 8  # Frame menunggu encoder; jika penuh frame rekaman dibuang, preview tidak ikut menunggu
+VIDEO_FOURCC = "mp4v"
+JPEG_QUALITY = 90
+
+
+class FrameRecorder:
+    """Tees frames from one camera's capture loop into a background encoder thread.
+
+    Modes can be combined: full-rate video (cv2.VideoWriter), interval time-lapse (one JPEG
+    every N seconds) and one-shot snapshots. offer() is called from the capture thread and only
+    copies a frame when some mode wants it; encoding happens on the recorder's own thread.
+    """
+    def __init__(self, camera_index, fps=30.0, record_dir=RECORD_DIR):
+        self.camera_index = camera_index
+        self.fps = fps
+        self.record_dir = record_dir
+        self.recording = False
+        self.timelapse_interval = None  # Detik antar frame time-lapse; None = nonaktif
+        self.dropped = 0
+        self._snapshot_requested = False
+        self._last_timelapse = 0.0
+        self._queue = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+        self._thread = None
+        self._writer = None
+
+    def start_recording(self):
+        self.recording = True
+        self._ensure_thread()
+
+    def stop_recording(self):
+        self.recording = False
+        self._put(("stop", 0.0, None), block=True)
+
+    def set_timelapse(self, interval):
+        """Save one frame every `interval` seconds; None turns time-lapse off."""
+        self.timelapse_interval = interval
+        self._last_timelapse = 0.0
+        if interval:
+            self._ensure_thread()
+
+    def snapshot(self):
+        self._snapshot_requested = True
+        self._ensure_thread()
+
+    def offer(self, frame):
+        """Capture thread: hand over a frame if any mode needs it (never blocks)."""
+        now = time.time()
+        if self.recording:
+            self._put(("video", now, frame.copy()))
+        if self.timelapse_interval and now - self._last_timelapse >= self.timelapse_interval:
+            self._last_timelapse = now
+            self._put(("timelapse", now, frame.copy()))
+        if self._snapshot_requested:
+            self._snapshot_requested = False
+            self._put(("snapshot", now, frame.copy()))
+
+    def close(self):
+        """Finish pending frames, close the video file and stop the encoder thread."""
+        self.recording = False
+        self.timelapse_interval = None
+        if self._thread is not None:
+            self._put(("close", 0.0, None), block=True)
+            self._thread.join()
+            self._thread = None
+
+    def _put(self, item, block=False):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(item, block=block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._encode_loop, name=f"recorder-{self.camera_index}", daemon=True)
+            self._thread.start()
+
+    def _encode_loop(self):
+        while True:
+            kind, timestamp, frame = self._queue.get()
+            try:
+                if kind == "close":
+                    self._release_writer()
+                    return
+                if kind == "stop":
+                    self._release_writer()
+                elif kind == "video":
+                    self._write_video(timestamp, frame)
+                else:
+                    self._write_jpeg(kind, timestamp, frame)
+            except (cv2.error, OSError) as e:
+                log.error("Kamera %d: gagal menyimpan %s: %s", self.camera_index, kind, e)
+
+    def _path(self, folder, timestamp, extension):
+        directory = os.path.join(self.record_dir, folder, f"cam{self.camera_index}")
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(directory, f"{name}.{extension}")
+
+    def _write_video(self, timestamp, frame):
+        if self._writer is None and not self.recording:
+            return  # Frame yang masih di antrian setelah stop tidak membuka file baru
+        if self._writer is None:
+            h, w = frame.shape[:2]
+            path = self._path("video", timestamp, "mp4")
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*VIDEO_FOURCC), self.fps, (w, h))
+            log.info("Kamera %d: merekam ke %s", self.camera_index, path)
+        self._writer.write(frame)
+
+    def _write_jpeg(self, folder, timestamp, frame):
+        path = self._path(folder, timestamp, "jpg")
+        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if folder == "snapshot":
+            log.info("Success: snapshot kamera %d disimpan ke %s", self.camera_index, path)
+
+    def _release_writer(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger("control")
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+# Nilai bawaan; bisa ditimpa bagian "control" di config.json
+DEFAULT_CONTROL = {
+    "period": 2.0,  # Detik per siklus kontrol
+    "stale_seconds": 30.0,  # Data sensor lebih tua dari ini: output ditahan
+    "temp": {"kp": 40.0, "ki": 0.4, "kd": 0.0},  # Peltier D (pendingin), 0..255
+    "lux": {"kp": 0.005, "ki": 0.002, "kd": 0.0},  # Grow light G/B, 0..255
+    "hum_band": 3.0,  # Histeresis humidifier: nyala < target - band, mati > target + band
+    "blue_ratio": 0.5,  # PWM biru relatif terhadap merah
+    "fan_idle": 0,  # PWM kipas P/R saat Peltier mati
+    "pwm_deadband": 3,  # Perubahan PWM lebih kecil dari ini tidak dikirim
+}
+JITTER_LOG_SECONDS = 300.0  # Ringkasan jitter periode ke log
+# Satu-satunya sensor live adalah board serial: sumber "ext" di riwayat, gauge "External" di UI
+MEASUREMENT_SOURCE = "ext"
+MEASUREMENT_LABEL = "External"
+
+
+def load_control_config():
+    """Controller settings merged from the defaults and the "control" section of config.json."""
+    control = {}
+    if os.path.exists(CONFIG_PATH):
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                control = json.load(f).get("control", {})
+        except Exception as e:
+            log.error("Error loading control config: %s", e)
+    config = {**DEFAULT_CONTROL, **control}
+    for loop in ("temp", "lux"):
+        config[loop] = {**DEFAULT_CONTROL[loop], **control.get(loop, {})}
+    return config
+
+
+class PID:
+    """PID with output clamping, conditional integration (anti-windup) and derivative on measurement."""
+    def __init__(self, kp, ki, kd, low=0.0, high=255.0):
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.low, self.high = low, high
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self._last = None
+
+    def update(self, error, measurement, dt):
+        derivative = 0.0 if self._last is None or dt <= 0 else -(measurement - self._last) / dt
+        self._last = measurement
+        output = self.kp * error + self.integral + self.kd * derivative
+        # Integral hanya bertambah jika output tidak jenuh ke arah yang sama
+        if self.low < output < self.high or (output >= self.high) != (error > 0):
+            self.integral = min(max(self.integral + self.ki * error * dt, self.low), self.high)
+        return min(max(output, self.low), self.high)
+
+
+class Hysteresis:
+    """On/off loop: switches on below `low` and off above `high`, keeps its state in between."""
+    def __init__(self):
+        self.state = False
+
+    def update(self, value, low, high):
+        if value < low:
+            self.state = True
+        elif value > high:
+            self.state = False
+        return self.state
+
+
+class ClimateController:
+    """Closed-loop climate control on its own thread, at a fixed period independent of the GUI.
+
+    Every tick reads the latest MEASUREMENT_SOURCE sample (the serial board, fed through
+    update_measurement from any thread) and the current setpoints, computes the actuator
+    outputs and sends only the commands whose value changed:
+      temp -> Peltier D (PID, cooling), fans P/R follow the Peltier
+      hum  -> humidifier H (hysteresis)
+      lux  -> grow lights G/B (PID)
+    Ticks are scheduled against absolute deadlines; lateness is measured as jitter.
+    """
+    def __init__(self, send, is_connected, config=None):
+        self.send = send
+        self.is_connected = is_connected
+        self.config = config or load_control_config()
+        self.period = self.config["period"]
+        self.temp_pid = PID(**self.config["temp"])
+        self.lux_pid = PID(**self.config["lux"])
+        self.humidifier = Hysteresis()
+        self._target = None  # callable(now) -> {"temp", "hum", "lux"}
+        self._measurement = None  # (time.time(), dict); diganti utuh, aman lintas thread
+        self._sent = {}  # kode -> nilai terakhir yang terkirim
+        self._stale_logged = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.generation = 0  # Naik setiap stop(); perintah dari run sebelumnya yang masih antri bisa dikenali
+        self.jitter = {"ticks": 0, "mean_ms": 0.0, "max_ms": 0.0, "overruns": 0}
+
+    def update_measurement(self, source, sample):
+        """Latest sample of a history source; only MEASUREMENT_SOURCE drives the loops."""
+        if source != MEASUREMENT_SOURCE:
+            return
+        self._measurement = (time.time(), dict(sample))
+
+    def latest(self):
+        """Newest measurement as a dict, or None if nothing fresh has arrived."""
+        measured_at, sample = self._measurement or (0.0, None)
+        return sample if time.time() - measured_at <= self.config["stale_seconds"] else None
+
+    def set_target(self, target):
+        """Setpoints as a dict, or a callable(now) returning one (e.g. an acclimation schedule)."""
+        self._target = target if callable(target) else (lambda now, t=dict(target): t)
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self, target=None):
+        if target is not None:
+            self.set_target(target)
+        if self._thread is not None:
+            return
+        self.temp_pid.reset()
+        self.lux_pid.reset()
+        self._sent.clear()
+        self.jitter = {"ticks": 0, "mean_ms": 0.0, "max_ms": 0.0, "overruns": 0}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="climate-control", daemon=True)
+        self._thread.start()
+        log.info("Kontrol iklim dimulai (periode %.1f s)", self.period)
+
+    def stop(self):
+        """Stop the loop and switch the controlled actuators off."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.generation += 1  # Perintah tick yang belum terkirim tidak boleh menimpa perintah mati di bawah
+        if self.is_connected():
+            fan = int(self.config["fan_idle"])
+            for code, value in (("D", 0), ("H", 0), ("G", 0), ("B", 0), ("P", fan), ("R", fan)):
+                self.send(f"{code}{value}\n")
+        self._sent.clear()
+        log.info("Kontrol iklim dihentikan")
+
+    def _loop(self):
+        deadline = time.monotonic()
+        last_tick = None
+        last_report = deadline
+        while True:
+            deadline += self.period
+            if self._stop.wait(max(0.0, deadline - time.monotonic())):
+                return
+            now = time.monotonic()
+            lateness = now - deadline
+            if lateness > self.period:
+                # Siklus terlewat (sistem sibuk): jadwal disusun ulang, bukan dikejar beruntun
+                self.jitter["overruns"] += 1
+                log.warning("Siklus kontrol terlambat %.0f ms", lateness * 1000)
+                deadline = now
+            self._record_jitter(lateness)
+            dt = self.period if last_tick is None else now - last_tick
+            last_tick = now
+            try:
+                self.tick(dt)
+            except Exception as e:
+                log.error("Siklus kontrol gagal: %s", e)
+            if now - last_report >= JITTER_LOG_SECONDS:
+                last_report = now
+                log.info("Jitter kontrol: rata-rata %.1f ms, maks %.1f ms, terlewat %d",
+                         self.jitter["mean_ms"], self.jitter["max_ms"], self.jitter["overruns"])
+
+    def _record_jitter(self, lateness):
+        stats = self.jitter
+        ms = max(lateness, 0.0) * 1000
+        stats["ticks"] += 1
+        stats["mean_ms"] += (ms - stats["mean_ms"]) / stats["ticks"]
+        stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def tick(self, dt):
+        """One control step: measurement + setpoints -> changed actuator commands."""
+        if self._target is None:
+            return
+        if not self.is_connected():
+            self._sent.clear()  # Setelah tersambung lagi semua output dikirim ulang
+            return
+        measured_at, sample = self._measurement or (0.0, {})
+        wall = time.time()
+        if wall - measured_at > self.config["stale_seconds"]:
+            if not self._stale_logged:
+                log.warning("Data sensor %s kedaluwarsa; output kontrol ditahan", MEASUREMENT_LABEL)
+                self._stale_logged = True
+            return
+        self._stale_logged = False
+        self._issue(self.compute(sample, self._target(wall), dt))
+
+    def compute(self, sample, target, dt):
+        """Actuator outputs {code: value} for one measurement; loops without data are left out."""
+        outputs = {}
+        temp, hum, lux = sample.get("temp"), sample.get("hum"), sample.get("lux")
+        if temp is not None and "temp" in target:
+            # Pendingin: output naik saat suhu di atas target
+            peltier = round(self.temp_pid.update(temp - target["temp"], -temp, dt))
+            fan = 255 if peltier > 0 else int(self.config["fan_idle"])
+            outputs.update(D=peltier, P=fan, R=fan)
+        if hum is not None and "hum" in target:
+            band = self.config["hum_band"]
+            outputs["H"] = int(self.humidifier.update(hum, target["hum"] - band, target["hum"] + band))
+        if lux is not None and "lux" in target:
+            red = self.lux_pid.update(target["lux"] - lux, lux, dt)
+            outputs.update(G=round(red), B=round(red * self.config["blue_ratio"]))
+        return outputs
+
+    def _issue(self, outputs):
+        deadband = self.config["pwm_deadband"]
+        for code, value in outputs.items():
+            last = self._sent.get(code)
+            if last == value:
+                continue
+            # PWM: perubahan kecil diabaikan, kecuali menuju 0 / 255
+            if last is not None and code != "H" and abs(value - last) < deadband and value not in (0, 255):
+                continue
+            self.send(f"{code}{value}\n")
+            self._sent[code] = value
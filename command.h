@@ -11,4 +11,62 @@ void processSerialCommands() {
 typedef struct {
     const char *cmd;
     void (*handler)(char *args);
-} Command;
\ No newline at end of file
+} Command;
+
+// Sensor commands (host -> board), one per line terminated by '\n':
+//   S        reply with one JSON frame: {"temp":..,"hum":..,"lux":..,"co2":..,"tvoc":..}
+//   S<ms>    start streaming one JSON frame every <ms> milliseconds and reply "OK S<ms>";
+//            S0 stops streaming. The host re-sends S<ms> whenever it adapts the rate
+//            and falls back to polling with plain S if no "OK S" arrives.
+void handle_sensor_command(char *args) {
+    if (args[0] == '\0') {
+        send_sensor_frame();
+        return;
+    }
+    stream_interval_ms = atol(args);
+    last_stream_ms = millis();
+    Serial.print("OK S");
+    Serial.println(stream_interval_ms);
+}
+
+// in loop(): push frames while streaming is enabled
+//   if (stream_interval_ms > 0 && millis() - last_stream_ms >= stream_interval_ms) {
+//       last_stream_ms += stream_interval_ms;
+//       send_sensor_frame();
+//   }
+
+// Framing commands:
+//   F1       switch sensor frames to binary and reply "OK F1"; F0 switches back to
+//            JSON and replies "OK F0". Acks and other text replies stay '\n' lines.
+// Binary sensor frame (little-endian, 23 bytes):
+//   0xA5 0x5A | len:u8 (=16) | seq:u16 | temp:f32 hum:f32 lux:f32 co2:u16 tvoc:u16 | crc:u16
+// crc is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over len, seq and payload.
+typedef struct __attribute__((packed)) {
+    uint8_t sync[2];
+    uint8_t len;
+    uint16_t seq;
+    float temp;
+    float hum;
+    float lux;
+    uint16_t co2;
+    uint16_t tvoc;
+    uint16_t crc;
+} SensorFrame;
+
+// Actuator commands: <code><value>, codes P R D G B (PWM 0..255) and U L H W AC (0/1).
+//   The board applies the value and acknowledges it with "OK <code><value>", e.g. "OK G128".
+//   Q        reply with the state of every actuator on one line, e.g.
+//            "ACT P255 R255 D0 G128 B64 U0 L1 H1 W0 AC1"
+//            The host asks on connect and periodically, and only re-sends values that differ.
+void handle_status_command(char *args) {
+    Serial.print("ACT P"); Serial.print(fan_perl_pwm);
+    Serial.print(" R"); Serial.print(fan_rad_pwm);
+    Serial.print(" D"); Serial.print(peltier_pwm);
+    Serial.print(" G"); Serial.print(grow_red_pwm);
+    Serial.print(" B"); Serial.print(grow_blue_pwm);
+    Serial.print(" U"); Serial.print(uv_on);
+    Serial.print(" L"); Serial.print(indicator_on);
+    Serial.print(" H"); Serial.print(humidifier_on);
+    Serial.print(" W"); Serial.print(pump_on);
+    Serial.print(" AC"); Serial.println(ac_on);
+}
@@ -1,45 +1,85 @@
-from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QSizePolicy, QTextEdit
+from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QSizePolicy, QPlainTextEdit, QComboBox
 from PySide6.QtCore import Qt, QTimer, QDateTime
-from PySide6.QtGui import QPixmap, QTextCursor
+from PySide6.QtGui import QPixmap, QTextCursor, QTransform, QTextCharFormat, QColor
 from pyqtgraph import PlotWidget
 import pyqtgraph as pg
 import requests
+import logging
 import os
 import time
 import random
-import sys
+import numpy as np
 from datetime import datetime
+from timeseries import TimeSeriesStore, RunningExtrema, CHANNELS, SOURCES, HISTORY_CAPACITY
+from history_store import SampleLog
+from history_query import HistoryQuery
+from history_export import ACTUATOR_SOURCE
+from ui_scheduler import FrameScheduler
+from app_logging import panel_handler
+from plant_vision import CANOPY_CHANNELS
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-DEBUG_LOG_TERMINAL = True  # Set True to show real terminal output in system log
+log = logging.getLogger("dashboard")
 
-class QTextEditLogger:
-    def __init__(self, text_edit):
+DEBUG_LOG_TERMINAL = True  # Set True to show real log output in system log
+LOG_FLUSH_MS = 250  # Interval penulisan batch log ke panel
+LOG_PANEL_LINES = 500  # Baris yang disimpan panel; baris lama dibuang Qt (salinan lengkap di logs/system.log)
+GRAPH_MIN_WIDTH = 320  # Piksel; batas bawah saat widget grafik belum ter-layout
+CANOPY_CAPACITY = 17280  # Sampel metrik kanopi per kamera (24 jam pada satu analisis per 5 detik)
+# Rentang grafik; di atas jendela retensi mentah (24 jam) grafik memakai rollup history_query
+GRAPH_RANGES = (("24 jam", 24 * 3600), ("7 hari", 7 * 86400), ("30 hari", 30 * 86400))
+
+class LogPanelFeeder:
+    """Drains queued log records into the System Log panel in one batch per timer tick (GUI thread only)."""
+    def __init__(self, text_edit, handler, parent, interval_ms=LOG_FLUSH_MS):
         self.text_edit = text_edit
-        self._stdout = sys.stdout
-        self._stderr = sys.stderr
-    def write(self, msg):
-        if msg.strip():
-            color = None
-            lower = msg.lower()
-            if "success" in lower:
-                color = "#81c784"  # Green
-            elif "warning" in lower:
-                color = "#ffd600"  # Yellow
-            elif "error" in lower:
-                color = "#e57373"  # Red
+        self.handler = handler
+        self.formats = {}
+        for key, color in (("error", "#e57373"), ("warning", "#ffd600"), ("success", "#81c784"), ("info", None)):
+            fmt = QTextCharFormat()
             if color:
-                html = f'<span style="color:{color};">{msg.rstrip()}</span>'
-                self.text_edit.append(html)
-            else:
-                self.text_edit.append(msg.rstrip())
-            self.text_edit.moveCursor(QTextCursor.End)
+                fmt.setForeground(QColor(color))
+            self.formats[key] = fmt
+        self.interval_ms = interval_ms
+        self.timer = QTimer(parent)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval_ms)
+
+    def pause(self):
+        """Page hidden: records wait in the handler's bounded backlog instead of being laid out."""
+        self.timer.stop()
+
+    def resume(self):
+        """Page shown: the backlog is drained once, then batching continues."""
+        self.flush()
+        self.timer.start(self.interval_ms)
+
     def flush(self):
-        pass
-    def restore(self):
-        sys.stdout = self._stdout
-        sys.stderr = self._stderr
+        # Record yang tidak muat di panel tidak perlu di-layout sama sekali
+        batch = self.handler.drain()[-self.text_edit.maximumBlockCount():]
+        if not batch:
+            return
+        doc = self.text_edit.document()
+        cursor = QTextCursor(doc)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for levelno, line in batch:
+            if not doc.isEmpty():
+                cursor.insertBlock()
+            cursor.insertText(line, self.formats[self.level_key(levelno, line)])
+        cursor.endEditBlock()
+        self.text_edit.moveCursor(QTextCursor.End)
+
+    @staticmethod
+    def level_key(levelno, line):
+        if levelno >= logging.ERROR:
+            return "error"
+        if levelno >= logging.WARNING:
+            return "warning"
+        if "success" in line.lower():
+            return "success"
+        return "info"
 
 class Dashboard(QWidget):
     def __init__(self):
@@ -162,7 +202,7 @@ class Dashboard(QWidget):
                 for v in values:
                     try:
                         if v > 0:
-                            labels.append(datetime.fromtimestamp(v).strftime("%H:%M"))
+                            labels.append(datetime.fromtimestamp(v).strftime("%d/%m" if spacing >= 86400 else "%H:%M"))
                         else:
                             labels.append("")
                     except Exception:
@@ -192,6 +232,14 @@ class Dashboard(QWidget):
         self.right_axis.linkToView(self.vb2)
         self.vb2.setXLink(self.plot)
         self.plot.getViewBox().sigResized.connect(self.update_views)
+        # Pilihan rentang (zoom out); rentang panjang dibaca dari rollup, bukan sampel mentah
+        self.graph_range = GRAPH_RANGES[0][1]
+        self.range_combo = QComboBox()
+        self.range_combo.setObjectName("dashboard-range-combo")
+        for text, seconds in GRAPH_RANGES:
+            self.range_combo.addItem(text, seconds)
+        self.range_combo.currentIndexChanged.connect(self.change_graph_range)
+        graph_container_layout.addWidget(self.range_combo, alignment=Qt.AlignRight)
         graph_container_layout.addWidget(self.plot)
 
         # Kanan: Container log (biru, border sama dengan lain)
@@ -211,16 +259,15 @@ class Dashboard(QWidget):
         log_label.setStyleSheet("background:#26343c; color:#ffd600; font-size:16px; font-weight:bold; border:2px solid #ffd600; border-radius:6px; padding:6px 0px; margin-top:12px; qproperty-alignment:'AlignCenter';")
         log_layout.addWidget(log_label)
         # Area log terminal (hijau)
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(LOG_PANEL_LINES)
         self.log_text.setObjectName("dashboard-log-text")
         self.log_text.setStyleSheet("background:#192428; color:#81c784; border:2px solid #81c784; border-radius:8px; font-family:Consolas,monospace; font-size:13px;")
         self.log_text.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         log_layout.addWidget(self.log_text, 1)
         if DEBUG_LOG_TERMINAL:
-            self.logger = QTextEditLogger(self.log_text)
-            sys.stdout = self.logger
-            sys.stderr = self.logger
+            self.log_feeder = LogPanelFeeder(self.log_text, panel_handler, self)
         else:
             # Mockup log
             self.mockup_logs = [
@@ -235,7 +282,7 @@ class Dashboard(QWidget):
                 "[INFO] System running normally"
             ]
             self.mockup_log_index = 0
-            self.log_text.append(self.mockup_logs[0])
+            self.log_text.appendPlainText(self.mockup_logs[0])
             # Timer untuk update mockup log
             self.log_timer = QTimer(self)
             self.log_timer.timeout.connect(self.update_mockup_log)
@@ -245,8 +292,10 @@ class Dashboard(QWidget):
         main_content_layout.addWidget(graph_container, alignment=Qt.AlignTop | Qt.AlignLeft)
         main_content_layout.addWidget(log_container, alignment=Qt.AlignTop | Qt.AlignLeft)
 
-        # Data dan line
-        self.timestamps, self.temp_data, self.hum_data, self.lux_data = [], [], [], []
+        # Data (ring buffer NumPy, kapasitas tetap, tersimpan ke disk) dan line
+        sample_log = SampleLog()
+        self.rollups = HistoryQuery(sample_log)
+        self.history = TimeSeriesStore(sample_log=sample_log, rollups=self.rollups)
         self.temp_line = self.plot.plot(pen=pg.mkPen("#ff9800", width=3))
         self.hum_line = self.plot.plot(pen=pg.mkPen("#00e5ff", width=3))
         self.lux_line = pg.PlotCurveItem(pen=pg.mkPen("#ffeb3b", width=3))
@@ -257,6 +306,14 @@ class Dashboard(QWidget):
         self.lux_label = pg.TextItem(color="#ffeb3b", anchor=(0,1), fill="#192428AA")
         for lbl in [self.temp_label, self.hum_label, self.lux_label]:
             self.plot.addItem(lbl)
+        # (kanal, line, label, format); min/max berjalan per kanal untuk normalisasi 0..1
+        self.graph_series = [
+            ("temp", self.temp_line, self.temp_label, "{:.1f}°C"),
+            ("hum", self.hum_line, self.hum_label, "{:.1f}%"),
+            ("lux", self.lux_line, self.lux_label, "{:.0f} lx"),
+        ]
+        self.extrema = {name: RunningExtrema() for name, *_ in self.graph_series}
+        self.restore_history()
 
         # Timer update data dummy
         # self.graph_timer = QTimer(self)
@@ -269,9 +326,10 @@ class Dashboard(QWidget):
         main_layout.addWidget(main_content, 1)
 
         # --- Timers ---
-        timer_datetime = QTimer(self)
-        timer_datetime.timeout.connect(self.update_datetime)
-        timer_datetime.start(1000)
+        # Jam hanya untuk tampilan: dihentikan saat halaman tersembunyi (page_hidden)
+        self.datetime_timer = QTimer(self)
+        self.datetime_timer.timeout.connect(self.update_datetime)
+        self.datetime_timer.start(1000)
         self.update_datetime()
 
         timer_temp = QTimer(self)
@@ -279,6 +337,22 @@ class Dashboard(QWidget):
         timer_temp.start(600000)
         self.update_temperature()
 
+    def page_shown(self):
+        self.update_datetime()
+        self.datetime_timer.start(1000)
+        if DEBUG_LOG_TERMINAL:
+            self.log_feeder.resume()
+        else:
+            self.log_timer.start(2000)
+
+    def page_hidden(self):
+        self.datetime_timer.stop()
+        # Panel log hanya tampilan: tidak ada insert teks selama halaman tersembunyi
+        if DEBUG_LOG_TERMINAL:
+            self.log_feeder.pause()
+        else:
+            self.log_timer.stop()
+
     def update_datetime(self):
         now = QDateTime.currentDateTime()
         self.date_label.setText(now.toString("dddd, dd MMMM yyyy"))
@@ -296,56 +370,119 @@ class Dashboard(QWidget):
             self.temp_label.setText("🌡️ N/A")
 
     def add_graph_data(self):
-        now = time.time()
-        self.timestamps.append(now)
-        self.temp_data.append(random.uniform(20, 35))
-        self.hum_data.append(random.uniform(40, 80))
-        self.lux_data.append(random.uniform(200, 1000))
-        self.update_graph()
+        self.update_sensor_data(random.uniform(20, 35), random.uniform(40, 80), random.uniform(200, 1000),
+                                random.randint(400, 2000), random.randint(0, 600), persist=False)
 
     def update_views(self):
         self.vb2.setGeometry(self.plot.getViewBox().sceneBoundingRect())
         self.vb2.linkedViewChanged(self.plot.getViewBox(), self.vb2.XAxis)
 
+    def change_graph_range(self, index):
+        self.graph_range = self.range_combo.itemData(index)
+        FrameScheduler.submit("dashboard-graph", self, self.update_graph)
+
     def update_graph(self):
-        if not self.timestamps:
+        if self.graph_range > self.history.retention:
+            self.update_graph_rollup()
             return
-        x = self.timestamps
-        y_temp = self.normalize(self.temp_data)
-        y_hum = self.normalize(self.hum_data)
-        y_lux = self.normalize(self.lux_data)
-        self.temp_line.setData(x, y_temp)
-        self.hum_line.setData(x, y_hum)
-        self.lux_line.setData(x, y_lux)
-        # Floating labels
-        if x:
-            self.temp_label.setText(f"{self.temp_data[-1]:.1f}°C")
-            self.temp_label.setPos(x[-1], y_temp[-1])
-            self.hum_label.setText(f"{self.hum_data[-1]:.1f}%")
-            self.hum_label.setPos(x[-1], y_hum[-1])
-            self.lux_label.setText(f"{self.lux_data[-1]:.0f} lx")
-            self.lux_label.setPos(x[-1], y_lux[-1])
-        self.plot.setXRange(min(x), max(x))
-        self.vb2.setXRange(min(x), max(x))
-
-    def normalize(self, data):
-        if not data:
-            return []
-        mn, mx = min(data), max(data)
+        # Level piramida min/max dipilih dari lebar widget: ~2 titik per piksel, konstan berapa pun panjang riwayat
+        x, data = self.history.view("ext", max_points=2 * max(self.plot.width(), GRAPH_MIN_WIDTH))
+        if not len(x):
+            return
+        window_start = self.history.window_start("ext")
+        for name, line, label, fmt in self.graph_series:
+            extrema = self.extrema[name]
+            extrema.expire(window_start)
+            scale, offset = self.normalize(extrema.bounds())
+            # Data mentah (view ring buffer) digambar apa adanya; normalisasi lewat transform item
+            line.setData(x, data[name])
+            line.setTransform(QTransform(1, 0, 0, scale, 0, offset))
+            value = data[name][-1]
+            if value == value:
+                label.setText(fmt.format(value))
+                label.setPos(x[-1], value * scale + offset)
+        # Timestamp berurutan: rentang X cukup dari elemen pertama dan terakhir
+        self.plot.setXRange(x[0], x[-1])
+        self.vb2.setXRange(x[0], x[-1])
+
+    def update_graph_rollup(self):
+        """Zoomed-out graph: bucket means from the rollups, resolution picked from the widget width."""
+        now = time.time()
+        x, data = self.rollups.rollup("ext", now - self.graph_range, now, max_points=max(self.plot.width(), GRAPH_MIN_WIDTH))
+        if not len(x):
+            return
+        for name, line, label, fmt in self.graph_series:
+            stats = data[name]
+            # Normalisasi dari min/max bucket (ekstrem asli), bukan dari rata-rata
+            lo, hi = np.fmin.reduce(stats["min"]), np.fmax.reduce(stats["max"])
+            scale, offset = self.normalize(None if lo != lo else (lo, hi))
+            line.setData(x, stats["mean"])
+            line.setTransform(QTransform(1, 0, 0, scale, 0, offset))
+            value = stats["last"][-1]
+            if value == value:
+                label.setText(fmt.format(value))
+                label.setPos(x[-1], stats["mean"][-1] * scale + offset)
+        self.plot.setXRange(now - self.graph_range, now)
+        self.vb2.setXRange(now - self.graph_range, now)
+
+    def normalize(self, bounds):
+        """(scale, offset) that maps the running [min, max] of a channel onto 0..1."""
+        if bounds is None:
+            return 1.0, 0.0
+        mn, mx = bounds
         if mx == mn:
-            return [0.5 for _ in data]
-        return [(v - mn) / (mx - mn) for v in data]
+            return 1.0, 0.5 - mn  # Data datar di tengah; skala 0 membuat transform tak terbalikkan
+        scale = 1.0 / (mx - mn)
+        return scale, -mn * scale
 
     def update_mockup_log(self):
         self.mockup_log_index = (self.mockup_log_index + 1) % len(self.mockup_logs)
-        self.log_text.append(self.mockup_logs[self.mockup_log_index])
+        self.log_text.appendPlainText(self.mockup_logs[self.mockup_log_index])
         self.log_text.moveCursor(QTextCursor.End)
 
-    def update_sensor_data(self, temp, hum, lux, eco2, tvoc, timestamp=None):
-        """Update the graph with new sensor data. Optionally use provided timestamp."""
+    def restore_history(self):
+        """Reload the last retention window from disk so the graph survives a restart."""
+        started = time.perf_counter()
+        for source in SOURCES:
+            self.rollups.add_source(source, CHANNELS)
+        # SampleLog() sudah menyelesaikan kompaksi hari lalu: file yang dibaca di sini tidak lagi dihapus
+        self.rollups.restore()
+        loaded = self.history.restore(capacity=self.source_capacity, exclude=(ACTUATOR_SOURCE,))
+        rows = loaded.get("ext")
+        if rows is not None and len(rows):
+            channels = self.history.buffers["ext"].channels
+            for name, extrema in self.extrema.items():
+                extrema.extend(rows[:, 0], rows[:, 1 + channels.index(name)])
+            FrameScheduler.submit("dashboard-graph", self, self.update_graph)
+        if loaded:
+            log.info("Riwayat dimuat: %s dalam %.0f ms", {source: len(r) for source, r in loaded.items()},
+                     (time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def source_capacity(source):
+        """Ring buffer size of a history source (camera metrics are sampled more sparsely)."""
+        return CANOPY_CAPACITY if source.startswith("cam") else HISTORY_CAPACITY
+
+    def cleanup(self):
+        """Tulis sisa riwayat ke disk."""
+        self.history.close()
+
+    def record_canopy_metrics(self, index, metrics):
+        """Store plant-vision metrics of a camera as the time series source "cam<index>"."""
+        source = f"cam{index}"
+        self.history.add_source(source, CANOPY_CHANNELS, CANOPY_CAPACITY)
+        self.history.append(source, metrics)
+
+    def update_sensor_data(self, temp, hum, lux, eco2, tvoc, timestamp=None, source="ext", persist=True):
+        """Store new sensor data and schedule a graph redraw (external source only). Optionally use provided timestamp.
+
+        persist=False keeps the sample in the in-memory graph only (debug data is not history).
+        """
+        sample = {"temp": temp, "hum": hum, "lux": lux, "co2": eco2, "tvoc": tvoc}
         now = timestamp if timestamp is not None else time.time()
-        self.timestamps.append(now)
-        self.temp_data.append(temp)
-        self.hum_data.append(hum)
-        self.lux_data.append(lux)
-        self.update_graph()
+        self.history.append(source, sample, now, persist)
+        if source == "ext":
+            for name, extrema in self.extrema.items():
+                extrema.push(now, sample[name])
+            # Redraw digabung per tick refresh UI, bukan per sampel
+            FrameScheduler.submit("dashboard-graph", self, self.update_graph)
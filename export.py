@@ -0,0 +1,53 @@
+"""Headless export of the stored sensor/actuator history, e.g.
+
+    python export.py --format csv --from 2025-06-01 --to 2025-06-30 --out export/
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from history_store import HISTORY_DIR, SampleLog
+from history_export import EXPORT_FORMATS, export_history, export_sources
+
+
+def parse_day(text):
+    return datetime.strptime(text, "%Y-%m-%d")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor riwayat sensor dan aktuator ke CSV/Parquet")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--out", default="export", help="folder tujuan (satu file per sumber)")
+    parser.add_argument("--from", dest="start", type=parse_day, help="tanggal awal YYYY-MM-DD (default: semua)")
+    parser.add_argument("--to", dest="end", type=parse_day, help="tanggal akhir YYYY-MM-DD, inklusif (default: sekarang)")
+    parser.add_argument("--days", type=float, help="hanya N hari terakhir")
+    parser.add_argument("--source", action="append", help="sumber yang diekspor (boleh berulang; default: semua)")
+    parser.add_argument("--history-dir", default=HISTORY_DIR)
+    parser.add_argument("--list", action="store_true", help="tampilkan sumber yang tersedia lalu keluar")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s", datefmt="%H:%M:%S")
+
+    # Read-only: aman dijalankan bersamaan dengan aplikasi (tidak ada kompaksi/penulisan)
+    sample_log = SampleLog(args.history_dir, writable=False)
+    if args.list:
+        for source, channels in sorted(export_sources(sample_log).items()):
+            print(f"{source}: {', '.join(channels)}")
+        return 0
+    t1 = (args.end + timedelta(days=1)).timestamp() - 0.001 if args.end else time.time()
+    if args.days:
+        t0 = t1 - args.days * 86400
+    else:
+        t0 = args.start.timestamp() if args.start else 0.0
+    try:
+        written = export_history(sample_log, args.out, args.format, t0, t1, args.source)
+    except (OSError, RuntimeError, ValueError) as e:
+        logging.getLogger("export").error("Ekspor gagal: %s", e)
+        return 1
+    if not written:
+        logging.getLogger("export").warning("Tidak ada riwayat untuk diekspor di %s", args.history_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
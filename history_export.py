@@ -0,0 +1,96 @@
+import csv
+import logging
+import os
+import time
+import numpy as np
+from history_store import CHUNK_ROWS
+
+log = logging.getLogger("export")
+
+EXPORT_FORMATS = ("csv", "parquet")
+ACTUATOR_SOURCE = "actuators"
+
+
+def export_sources(sample_log):
+    """{source: channels} that can be exported: raw sensor, camera and actuator sources, no rollups."""
+    return {source: channels for source, channels in sample_log.sources().items() if "@" not in source}
+
+
+def iter_chunks(sample_log, source, t0, t1, chunk_rows=CHUNK_ROWS):
+    """Stage 1: stored rows of one source, chunk by chunk."""
+    yield from sample_log.iter_rows(source, t0, t1, chunk_rows)
+
+
+def with_utc(chunks):
+    """Stage 2: ISO-8601 UTC column for every chunk, computed per chunk with NumPy."""
+    for rows in chunks:
+        stamps = np.datetime_as_string((rows[:, 0] * 1000).astype("datetime64[ms]"), unit="ms")
+        yield rows, stamps
+
+
+def write_csv(path, channels, chunks):
+    """Stage 3 (CSV): NaN becomes an empty field; returns the number of rows written."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("timestamp", "utc") + tuple(channels))
+        for rows, stamps in chunks:
+            values = rows[:, 1:].astype(object)
+            values[np.isnan(rows[:, 1:])] = ""
+            writer.writerows(zip(rows[:, 0].tolist(), stamps.tolist(), *values.T.tolist()))
+            count += len(rows)
+    return count
+
+
+def write_parquet(path, channels, chunks):
+    """Stage 3 (Parquet): one row group per chunk; needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Ekspor Parquet membutuhkan paket pyarrow (pip install pyarrow)")
+    schema = pa.schema([("timestamp", pa.timestamp("ms", tz="UTC"))] + [(name, pa.float64()) for name in channels])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows, _ in chunks:
+            columns = [pa.array((rows[:, 0] * 1000).astype("int64"), pa.int64()).cast(schema.field(0).type)]
+            # NaN disimpan sebagai null agar terbaca sebagai nilai kosong
+            columns += [pa.array(rows[:, i + 1], from_pandas=True) for i in range(len(channels))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            count += len(rows)
+    return count
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def export_history(sample_log, out_dir, fmt="csv", t0=0.0, t1=None, sources=None, progress=None):
+    """Stream every selected source to <out_dir>/<source>.<fmt>; returns {path: rows}.
+
+    Each source runs through iter_chunks -> with_utc -> writer, so memory use stays at one
+    chunk regardless of the exported range. progress(source, rows) is called after each file.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    t1 = time.time() if t1 is None else t1
+    available = export_sources(sample_log)
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    for source in sources or sorted(available):
+        if source not in available:
+            log.warning("Sumber riwayat tidak ditemukan: %s", source)
+            continue
+        path = os.path.join(out_dir, f"{source}.{fmt}")
+        tmp = path + ".part"
+        try:
+            count = WRITERS[fmt](tmp, available[source], with_utc(iter_chunks(sample_log, source, t0, t1)))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)  # File setengah jadi tidak ditinggalkan
+            raise
+        written[path] = count
+        log.info("Ekspor %s: %d baris ke %s", source, count, path)
+        if progress is not None:
+            progress(source, count)
+    return written
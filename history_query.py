@@ -0,0 +1,195 @@
+import time
+import numpy as np
+from timeseries import RingBuffer
+
+# (label, detik per bucket, kapasitas bucket di memori); bucket lebih tua dibaca dari disk
+RESOLUTIONS = (
+    ("1m", 60, 7 * 24 * 60),
+    ("15m", 15 * 60, 35 * 24 * 4),
+    ("1h", 3600, 366 * 24),
+    ("1d", 86400, 10 * 366),
+)
+STATS = ("min", "max", "sum", "count", "last")
+
+
+def rollup_columns(channels):
+    return tuple(f"{name}.{stat}" for name in channels for stat in STATS)
+
+
+def _utc_offset():
+    return time.localtime().tm_gmtoff
+
+
+def aggregate(rows, seconds, offset=0):
+    """Vectorized rollup of sorted raw rows [t, *channels] into [bucket_start, per channel: min, max, sum, count, last]."""
+    width = rows.shape[1] - 1
+    if not len(rows):
+        return np.empty((0, 1 + len(STATS) * width))
+    times, values = rows[:, 0], rows[:, 1:]
+    keys = np.floor((times + offset) / seconds) * seconds - offset  # Bucket harian mengikuti tengah malam lokal
+    starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+    valid = ~np.isnan(values)
+    # Indeks nilai valid terakhir per bucket (-1 jika semua NaN)
+    last_at = np.maximum.reduceat(np.where(valid, np.arange(len(rows))[:, None], -1), starts, axis=0)
+    out = np.empty((len(starts), 1 + len(STATS) * width))
+    out[:, 0] = keys[starts]
+    stats = out[:, 1:].reshape(len(starts), width, len(STATS))
+    stats[:, :, 0] = np.fmin.reduceat(values, starts, axis=0)
+    stats[:, :, 1] = np.fmax.reduceat(values, starts, axis=0)
+    stats[:, :, 2] = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    stats[:, :, 3] = np.add.reduceat(valid, starts, axis=0)
+    stats[:, :, 4] = np.where(last_at >= 0, values[np.maximum(last_at, 0), np.arange(width)], np.nan)
+    return out
+
+
+class _OpenBucket:
+    """Incremental min/max/sum/count/last of the bucket currently being filled."""
+    def __init__(self, width):
+        self.start = None
+        self.stats = np.empty((width, len(STATS)))
+
+    def reset(self, start):
+        self.start = start
+        self.stats[:, 0] = np.nan
+        self.stats[:, 1] = np.nan
+        self.stats[:, 2:4] = 0.0
+        self.stats[:, 4] = np.nan
+
+    def load(self, row):
+        """Continue a bucket from an aggregated row (startup rebuild)."""
+        self.start = row[0]
+        self.stats[:] = row[1:].reshape(self.stats.shape)
+
+    def add(self, values):
+        valid = ~np.isnan(values)
+        self.stats[:, 0] = np.fmin(self.stats[:, 0], values)
+        self.stats[:, 1] = np.fmax(self.stats[:, 1], values)
+        self.stats[valid, 2] += values[valid]
+        self.stats[valid, 3] += 1
+        self.stats[valid, 4] = values[valid]
+
+    def row(self):
+        return np.r_[self.start, self.stats.ravel()]
+
+
+class RollupIndex:
+    """min/max/mean/last rollups of one source at every resolution, maintained as samples arrive.
+
+    Closed buckets go to an in-memory RingBuffer per resolution and to the SampleLog as source
+    "<source>@<label>". The bucket still being filled is rebuilt from raw samples at startup, so
+    nothing is lost when the app stops mid-bucket.
+    """
+    def __init__(self, source, channels, sample_log=None, resolutions=RESOLUTIONS):
+        self.source = source
+        self.channels = tuple(channels)
+        self.sample_log = sample_log
+        self.columns = rollup_columns(self.channels)
+        self.offset = _utc_offset()
+        self.levels = {}
+        for label, seconds, capacity in resolutions:
+            self.levels[label] = (seconds, RingBuffer(capacity, self.columns), _OpenBucket(len(self.channels)))
+
+    def add(self, row):
+        """O(1) per resolution: fold one raw [t, *channels] row into the open buckets."""
+        t, values = row[0], row[1:]
+        for label, (seconds, ring, bucket) in self.levels.items():
+            start = np.floor((t + self.offset) / seconds) * seconds - self.offset
+            if bucket.start != start:
+                if bucket.start is not None:
+                    self._close(label, ring, bucket.row())
+                bucket.reset(start)
+            bucket.add(values)
+
+    def restore(self, now=None):
+        """Reload closed buckets from disk and rebuild everything newer from the raw log."""
+        if self.sample_log is None:
+            return
+        now = time.time() if now is None else now
+        for label, (seconds, ring, bucket) in self.levels.items():
+            stored = self.sample_log.load(f"{self.source}@{label}", now - seconds * ring.capacity, now)
+            if stored.shape[1] == len(self.columns) + 1:
+                ring.extend(stored)
+            since = ring.times(1)[0] + seconds if ring.size else now - seconds * ring.capacity
+            # Raw yang belum ter-rollup (bucket terbuka, atau bucket yang hilang saat crash)
+            raw = self.sample_log.load(self.source, max(since, now - 2 * 86400), now)
+            if raw.shape[1] != len(self.channels) + 1:
+                continue
+            rows = aggregate(raw, seconds, self.offset)
+            for closed in rows[:-1]:
+                self._close(label, ring, closed)
+            if len(rows):
+                bucket.load(rows[-1])
+
+    def query(self, label, t0, t1=None):
+        """Buckets with t0 <= start <= t1 as (starts, {channel: {"min", "max", "mean", "last"}})."""
+        t1 = time.time() if t1 is None else t1
+        seconds, ring, bucket = self.levels[label]
+        oldest = ring.times()[0] if ring.size else np.inf
+        parts = []
+        if t0 < oldest and self.sample_log is not None:
+            # Di luar jendela memori: bucket lama dari disk
+            disk = self.sample_log.load(f"{self.source}@{label}", t0, min(t1, oldest - seconds))
+            if disk.shape[1] == len(self.columns) + 1:
+                parts.append(disk)
+        count = ring.between(t0, t1)
+        if count:
+            first = ring.size - ring.since(t0)
+            window = slice(first, first + count)
+            parts.append(np.column_stack([ring.times()[window]] + [ring.channel(c)[window] for c in self.columns]))
+        if bucket.start is not None and t0 <= bucket.start <= t1:
+            parts.append(bucket.row()[None, :])
+        data = np.concatenate(parts) if parts else np.empty((0, len(self.columns) + 1))
+        stats = data[:, 1:].reshape(len(data), len(self.channels), len(STATS))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = stats[:, :, 2] / stats[:, :, 3]
+        result = {}
+        for i, name in enumerate(self.channels):
+            result[name] = {"min": stats[:, i, 0], "max": stats[:, i, 1], "mean": mean[:, i], "last": stats[:, i, 4]}
+        return data[:, 0], result
+
+    def pick(self, span, max_points):
+        """Finest resolution that keeps a span of seconds within max_points buckets."""
+        for label, (seconds, _, _) in self.levels.items():
+            if span / seconds <= max_points:
+                return label
+        return label
+
+    def _close(self, label, ring, row):
+        ring.append_row(row)
+        if self.sample_log is not None:
+            self.sample_log.append(f"{self.source}@{label}", self.columns, row)
+
+
+class HistoryQuery:
+    """Rollup queries over the stored sensor history, one RollupIndex per source."""
+    def __init__(self, sample_log=None):
+        self.sample_log = sample_log
+        self.indexes = {}
+
+    def add_source(self, source, channels):
+        """Register a source; its stored buckets are loaded by restore(), not here."""
+        if source not in self.indexes:
+            self.indexes[source] = RollupIndex(source, channels, self.sample_log)
+        return self.indexes[source]
+
+    def restore(self, now=None):
+        """Rebuild every registered source from disk.
+
+        Reads the same day files the SampleLog compacts, so it must run after the log is open
+        (SampleLog.__init__ finishes the startup compaction) and before new samples are added.
+        """
+        now = time.time() if now is None else now
+        for index in self.indexes.values():
+            index.restore(now)
+
+    def add(self, source, row):
+        if source in self.indexes:
+            self.indexes[source].add(row)
+
+    def rollup(self, source, t0, t1=None, resolution=None, max_points=None):
+        """Rollups of source over [t0, t1]; the resolution is picked from max_points when not given."""
+        index = self.indexes[source]
+        t1 = time.time() if t1 is None else t1
+        if resolution is None:
+            resolution = index.pick(t1 - t0, max_points or 1000)
+        return index.query(resolution, t0, t1)
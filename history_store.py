@@ -0,0 +1,251 @@
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+log = logging.getLogger("history")
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history")
+FLUSH_SAMPLES = 256  # Baris per chunk sebelum ditulis
+FLUSH_SECONDS = 30.0  # Batas umur data yang belum tertulis (jendela kehilangan saat crash)
+MIN_CHUNK_ROWS = 32  # Sumber jarang (kamera, laju lambat) menunggu sampai sekian baris...
+SPARSE_FLUSH_SECONDS = 300.0  # ...atau paling lama selama ini
+ROLLUP_FLUSH_SECONDS = 4 * 3600.0  # Bucket rollup ("<source>@<res>") dibangun ulang dari data mentah setelah crash
+FLUSH_TIMEOUT = 60.0  # Detik menunggu writer pada flush()
+CHUNK_ROWS = 65536  # Baris per potongan saat membaca riwayat secara streaming (ekspor)
+
+
+def day_of(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+
+def _time_range(path):
+    """(first_ms, last_ms) encoded in a chunk/segment file name."""
+    _, first, last = os.path.basename(path)[:-len(".npy")].split("_")
+    return int(first), int(last)
+
+
+def _write_atomic(path, rows):
+    """Write rows as .npy so that a crash leaves either the old state or the complete file."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SampleLog:
+    """Append-only, crash-safe on-disk sample log: one directory per source, one per day.
+
+    Rows are float64 [timestamp, *channels]. A writer thread collects appended rows and writes
+    them as immutable .npy chunks (at most FLUSH_SAMPLES rows or FLUSH_SECONDS old). When the
+    day rolls over, the chunks of past days are compacted into one segment per day. File names
+    carry the first/last timestamp in ms, which is the time index used by load().
+
+        history/<source>/channels.json
+        history/<source>/<YYYY-MM-DD>/segment_<first>_<last>.npy
+        history/<source>/<YYYY-MM-DD>/chunk_<first>_<last>.npy
+
+    Past days are compacted in __init__, before anything can be read. The midnight compaction
+    runs while readers may be listing files, so iter_rows() re-lists a day whose chunk
+    disappeared. With writable=False no writer thread is started and nothing on disk is
+    touched, so another process (e.g. the export CLI) can read while the app is running.
+    """
+    def __init__(self, root=HISTORY_DIR, writable=True):
+        self.root = root
+        self._queue = queue.SimpleQueue()
+        self._channels = {}
+        self._thread = None
+        if writable:
+            # Kompaksi selesai sebelum ada yang membaca: chunk hari lalu tidak hilang di tengah load()
+            self._compact_past_days()
+            self._thread = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def sources(self):
+        """{source: channels} of every source that has data on disk."""
+        found = {}
+        for path in glob.glob(os.path.join(self.root, "*", "channels.json")):
+            try:
+                with open(path, "r") as f:
+                    found[os.path.basename(os.path.dirname(path))] = tuple(json.load(f))
+            except (OSError, ValueError) as e:
+                log.warning("Skema riwayat rusak %s: %s", path, e)
+        return found
+
+    def append(self, source, channels, row):
+        """Queue one [timestamp, *channels] row; returns immediately."""
+        self._queue.put((source, tuple(channels), row))
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Write everything appended so far and wait for it to reach the disk.
+
+        Raises RuntimeError if the writer thread is gone or does not finish within timeout.
+        """
+        if self._thread is None:
+            return
+        if not self._thread.is_alive():
+            raise RuntimeError("Penulis riwayat tidak berjalan")
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        if not done.wait(timeout):
+            raise RuntimeError(f"Penulis riwayat tidak selesai dalam {timeout:.0f} s")
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(("close", None, None))
+            self._thread.join()
+            self._thread = None
+
+    def load(self, source, t0, t1=None):
+        """Rows of source with t0 <= timestamp <= t1 as one (n, 1 + channels) array, oldest first."""
+        parts = list(self.iter_rows(source, t0, t1, chunk_rows=None))
+        if not parts:
+            width = len(self.sources().get(source, ())) + 1
+            return np.empty((0, width))
+        return np.concatenate(parts)
+
+    def iter_rows(self, source, t0=0.0, t1=None, chunk_rows=CHUNK_ROWS):
+        """Yield the rows of [t0, t1] in time order, at most chunk_rows per array (None: one per file).
+
+        Files are memory-mapped and only one chunk is copied at a time, so any range can be
+        streamed in constant memory.
+        """
+        t1 = time.time() if t1 is None else t1
+        source_dir = os.path.join(self.root, source)
+        first_day, last_day = day_of(t0), day_of(t1)
+        try:
+            days = sorted(d for d in os.listdir(source_dir) if len(d) == 10 and first_day <= d <= last_day)
+        except FileNotFoundError:
+            return
+        sent = None  # Timestamp baris terakhir yang sudah dikirim
+        for day in days:
+            day_dir = os.path.join(source_dir, day)
+            files = self._day_files(day_dir)
+            resumed = False
+            while files:
+                path = files.pop(0)
+                first, last = _time_range(path)
+                if last < t0 * 1000 or first > t1 * 1000:
+                    continue
+                try:
+                    rows = np.load(path, mmap_mode="r")
+                except FileNotFoundError:
+                    # Chunk baru saja dikompaksi ke segment: ambil ulang daftar, lanjut setelah baris terakhir
+                    resumed = sent is not None
+                    files = [p for p in self._day_files(day_dir) if not resumed or _time_range(p)[1] >= sent * 1000]
+                    continue
+                times = rows[:, 0]
+                start, stop = np.searchsorted(times, t0, "left"), np.searchsorted(times, t1, "right")
+                if resumed:
+                    start = max(start, np.searchsorted(times, sent, "right"))
+                step = chunk_rows or max(stop - start, 1)
+                for i in range(start, stop, step):
+                    part = np.array(rows[i:min(i + step, stop)])
+                    sent = part[-1, 0]
+                    yield part
+
+    def _day_files(self, day_dir):
+        """Segment and chunk files of one day in time order, without chunks already compacted."""
+        files = glob.glob(os.path.join(day_dir, "*.npy"))
+        segments = [p for p in files if os.path.basename(p).startswith("segment_")]
+        compacted_until = max((_time_range(p)[1] for p in segments), default=-1)
+        # Chunk yang sudah masuk segment (crash di tengah kompaksi) dilewati
+        chunks = [p for p in files if os.path.basename(p).startswith("chunk_") and _time_range(p)[1] > compacted_until]
+        return sorted(segments + chunks, key=_time_range)
+
+    def _write_loop(self):
+        pending = {}  # source -> list of rows
+        oldest = {}  # source -> time.monotonic() of the first pending row
+        current_day = day_of(time.time())
+        while True:
+            try:
+                source, channels, row = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                source = None
+            try:
+                if source in ("flush", "close"):
+                    for name in list(pending):
+                        self._write_chunk(name, pending.pop(name))
+                    oldest.clear()
+                    if source == "close":
+                        return
+                    continue
+                if source is not None:
+                    if self._channels.get(source) != channels:
+                        self._write_schema(source, channels)
+                    pending.setdefault(source, []).append(row)
+                    oldest.setdefault(source, time.monotonic())
+                now = time.monotonic()
+                for name in [n for n, rows in pending.items() if self._due(n, len(rows), now - oldest[n])]:
+                    del oldest[name]
+                    self._write_chunk(name, pending.pop(name))
+                if day_of(time.time()) != current_day:
+                    current_day = day_of(time.time())
+                    self._compact_past_days()
+            except Exception as e:
+                # Disk penuh / izin eMMC: thread tetap hidup, data berikutnya dicoba lagi
+                log.error("Penulis riwayat gagal: %s", e)
+            finally:
+                if source == "flush":
+                    row.set()
+
+    @staticmethod
+    def _due(source, rows, age):
+        """Whether pending rows of a source should be written now (few, larger files for sparse sources)."""
+        if rows >= FLUSH_SAMPLES:
+            return True
+        if "@" in source:
+            return age >= ROLLUP_FLUSH_SECONDS
+        return age >= SPARSE_FLUSH_SECONDS or (age >= FLUSH_SECONDS and rows >= MIN_CHUNK_ROWS)
+
+    def _write_schema(self, source, channels):
+        source_dir = os.path.join(self.root, source)
+        os.makedirs(source_dir, exist_ok=True)
+        tmp = os.path.join(source_dir, "channels.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(list(channels), f)
+        os.replace(tmp, os.path.join(source_dir, "channels.json"))
+        self._channels[source] = channels
+
+    def _write_chunk(self, source, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        # Chunk tidak pernah melewati tengah malam: dipisah per hari
+        days = np.array([day_of(t) for t in rows[:, 0]])
+        for day in np.unique(days):
+            part = rows[days == day]
+            day_dir = os.path.join(self.root, source, day)
+            name = f"chunk_{int(part[0, 0] * 1000)}_{int(part[-1, 0] * 1000)}.npy"
+            try:
+                os.makedirs(day_dir, exist_ok=True)
+                _write_atomic(os.path.join(day_dir, name), part)
+            except OSError as e:
+                log.error("Gagal menulis riwayat %s: %s", source, e)
+
+    def _compact_past_days(self):
+        """Merge the chunks of every day before today into a single segment file."""
+        today = day_of(time.time())
+        for day_dir in glob.glob(os.path.join(self.root, "*", "????-??-??")):
+            try:
+                for tmp in glob.glob(os.path.join(day_dir, "*.tmp")):
+                    os.remove(tmp)  # Sisa tulisan yang terputus
+                if os.path.basename(day_dir) >= today:
+                    continue
+                files = self._day_files(day_dir)
+                if not any(os.path.basename(p).startswith("chunk_") for p in files):
+                    continue
+                rows = np.concatenate([np.load(p) for p in files])
+                name = f"segment_{int(rows[0, 0] * 1000)}_{int(rows[-1, 0] * 1000)}.npy"
+                _write_atomic(os.path.join(day_dir, name), rows)
+                for path in glob.glob(os.path.join(day_dir, "*.npy")):
+                    if os.path.basename(path) != name:
+                        os.remove(path)
+            except (OSError, ValueError) as e:
+                log.error("Gagal kompaksi riwayat %s: %s", day_dir, e)
@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import logging
 import paho.mqtt.client as mqtt
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -14,9 +15,14 @@ from dashboard import Dashboard
 from sensors import Sensors
 from manual import Manual
 from auto import Auto
+from ui_scheduler import FrameScheduler
+from app_logging import setup_logging, shutdown_logging
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+log = logging.getLogger("main")
+mqtt_log = logging.getLogger("mqtt")
+
 
 class MqttClient(QObject):
     message_received = Signal(str)
@@ -29,22 +35,22 @@ class MqttClient(QObject):
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
-            print("MQTT Worker: Terhubung ke Broker!")
+            mqtt_log.info("Success: terhubung ke broker!")
             client.subscribe("sensor/data")
         else:
-            print(f"MQTT Worker: Gagal terhubung, kode: {rc}")
+            mqtt_log.error("Gagal terhubung, kode: %s", rc)
 
     def on_message(self, client, userdata, msg):
         data = msg.payload.decode()
         self.message_received.emit(data)
 
     def run(self):
-        print("MQTT Worker: Memulai koneksi...")
+        mqtt_log.info("Memulai koneksi...")
         try:
             self.client.connect("localhost", 1883, 60)
             self.client.loop_forever()
         except Exception as e:
-            print(f"MQTT Worker: Error - {e}")
+            mqtt_log.error("Error - %s", e)
 
 
 class MainWindow(QMainWindow):
@@ -75,15 +81,37 @@ class MainWindow(QMainWindow):
         # Main widgets
         self.settings_widget = Settings()
         self.dashboard_widget = Dashboard()
+        # Perintah aktuator dicatat ke log riwayat yang sama (sumber "actuators") dan ikut diekspor
+        Settings.history = self.dashboard_widget.history.sample_log
         self.sensors_widget = Sensors(dashboard_widget=self.dashboard_widget)
         self.manual_widget = Manual()  # Manual page
         self.camera_widget = Camera()
         self.auto_widget = Auto()
+        # Kontrol iklim membaca sampel board serial (sumber "ext", gauge External)
+        self.sensors_widget.sample_processed.connect(self.auto_widget.controller.update_measurement)
 
         # Signal for enabling/disabling device controls
         self.settings_widget.connection_changed.connect(
             self.sensors_widget.set_controls_enabled
         )
+        self.settings_widget.connection_changed.connect(
+            self.sensors_widget.handle_connection_changed
+        )
+        # Frame sensor dari serial worker (sudah di-parse di thread serial)
+        self.settings_widget.frame_received.connect(
+            self.sensors_widget.handle_sensor_frame
+        )
+        self.settings_widget.response_received.connect(
+            self.sensors_widget.handle_sensor_response
+        )
+        self.settings_widget.request_failed.connect(
+            self.sensors_widget.handle_sensor_request_failed
+        )
+
+        # Metrik kanopi kamera disimpan sebagai time series di samping data sensor
+        self.camera_widget.canopy_measured.connect(
+            self.dashboard_widget.record_canopy_metrics
+        )
 
         # Stacked widget for main content
         self.stacked_widget = QStackedWidget()
@@ -94,6 +122,19 @@ class MainWindow(QMainWindow):
         self.stacked_widget.addWidget(self.camera_widget)     # 4
         self.stacked_widget.addWidget(self.settings_widget)   # 5
         main_layout.addWidget(self.stacked_widget, 1)
+        self.stacked_widget.currentChanged.connect(self.handle_page_changed)
+
+    def handle_page_changed(self, index):
+        """Page visibility protocol: hidden pages pause rendering-only work, the shown page catches up once."""
+        previous = self.stacked_widget.widget(self.last_index)
+        if previous is not None and hasattr(previous, "page_hidden"):
+            previous.page_hidden()
+        self.last_index = index
+        current = self.stacked_widget.widget(index)
+        if hasattr(current, "page_shown"):
+            current.page_shown()
+        # Update yang tertahan selama halaman tersembunyi diterapkan sekaligus
+        FrameScheduler.instance().flush()
 
     def init_mqtt(self):
         self.mqtt_thread = QThread()
@@ -104,11 +145,11 @@ class MainWindow(QMainWindow):
         self.mqtt_worker.message_received.connect(self.update_gui_with_mqtt_data)
 
         self.mqtt_thread.start()
-        print("Main thread: Thread MQTT dimulai.")
+        log.info("Thread MQTT dimulai.")
 
     def update_gui_with_mqtt_data(self, message):
         """Slot: update dashboard with new MQTT data."""
-        print(f"Main thread: Menerima data dari MQTT -> {message}")
+        mqtt_log.debug("Menerima data -> %s", message)
         try:
             parts = message.split(',')
             if len(parts) == 5:
@@ -117,7 +158,7 @@ class MainWindow(QMainWindow):
                 lux = int(parts[2])
                 eco2 = int(parts[3])
                 tvoc = int(parts[4])
-                print(f"Data Parsed -> Temp: {temp}, Hum: {hum}, Lux: {lux}, eCO2: {eco2}, TVOC: {tvoc}")
+                mqtt_log.debug("Data Parsed -> Temp: %s, Hum: %s, Lux: %s, eCO2: %s, TVOC: %s", temp, hum, lux, eco2, tvoc)
                 self.dashboard_widget.update_sensor_data(temp, hum, lux, eco2, tvoc)
                 sensor_data = {
                     "temp": temp,
@@ -126,11 +167,11 @@ class MainWindow(QMainWindow):
                     "hum": hum,
                     "lux": lux
                 }
-                self.sensors_widget.update_gauges_from_dict(sensor_data, is_internal=False)  # External
+                self.sensors_widget.show_sample(sensor_data, is_internal=False)  # External
             else:
-                print(f"Main thread: Format data tidak sesuai, jumlah bagian: {len(parts)}")
+                mqtt_log.warning("Format data tidak sesuai, jumlah bagian: %d", len(parts))
         except (ValueError, IndexError) as e:
-            print(f"Main thread: Error saat mem-parse data: {e}")
+            mqtt_log.error("Error saat mem-parse data: %s", e)
 
     def update_internal_from_json(self):
         json_path = os.path.join(BASE_DIR, "sensor_values.json")
@@ -139,8 +180,10 @@ class MainWindow(QMainWindow):
                 with open(json_path, "r") as f:
                     data = json.load(f)
                 self.sensors_widget.update_gauges_from_dict(data, is_internal=True)
+                # Snapshot statis, bukan pengukuran: hanya di memori, tidak masuk log riwayat/rollup/ekspor
+                self.dashboard_widget.history.append("int", data, persist=False)
             except Exception as e:
-                print(f"Error loading internal sensor values: {e}")
+                log.error("Error loading internal sensor values: %s", e)
 
     def create_sidebar(self):
         sidebar = QWidget()
@@ -183,19 +226,23 @@ class MainWindow(QMainWindow):
         return sidebar
 
     def closeEvent(self, event):
-        print("Menutup aplikasi...")
+        log.info("Menutup aplikasi...")
         if self.mqtt_thread.isRunning():
-            print("Menghentikan thread MQTT...")
+            log.info("Menghentikan thread MQTT...")
             self.mqtt_thread.quit()
             self.mqtt_thread.wait()
-            print("Thread MQTT dihentikan.")
+            log.info("Thread MQTT dihentikan.")
+        self.auto_widget.cleanup()  # Sebelum serial ditutup: perintah mematikan aktuator diantrikan, worker mengirim habis saat berhenti
         self.camera_widget.cleanup()
         self.settings_widget.disconnect_serial_port()
-        print("Semua koneksi dihentikan. Keluar.")
+        Settings.actuators.save_config()  # Hanya jika nilai Manual berubah: jadi nilai awal saat start berikutnya
+        self.dashboard_widget.cleanup()
+        log.info("Semua koneksi dihentikan. Keluar.")
         event.accept()
 
 
 def main():
+    setup_logging()
     app = QApplication(sys.argv)
     style_path = os.path.join(BASE_DIR, "style.qss")
     if os.path.exists(style_path):
@@ -203,7 +250,9 @@ def main():
             app.setStyleSheet(f.read())
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    shutdown_logging()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -6,12 +6,19 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Slot
 from settings import Settings
 from slide_switch import SlideSwitch
+from ui_scheduler import Throttle, Debounce
+
+SLIDER_STREAM_HZ = 20  # Maks perintah per slider per detik saat digeser (nilai terbaru menang)
+TOGGLE_DEBOUNCE_MS = 150  # Toggle yang dibolak-balik cepat hanya mengirim posisi akhirnya
 
 class Manual(QWidget):
     def __init__(self):
         super().__init__()
         self.setObjectName("manual-container")
         self.control_widgets = []
+        self.switches = {}  # kode -> SlideSwitch
+        self.sliders = {}  # kode -> QSlider
+        self.slider_labels = {}  # kode -> QLabel nilai slider
         main_layout = QVBoxLayout(self)
         main_layout.setAlignment(Qt.AlignTop)
         main_layout.setContentsMargins(24, 24, 24, 24)
@@ -28,13 +35,16 @@ class Manual(QWidget):
             label = QLabel(label_text)
             label.setObjectName("toggle-label")
             switch = SlideSwitch()
-            switch.setChecked(False)
-            switch.toggled.connect(lambda checked, c=cmd: Settings.send_command(f"{c}{'1' if checked else '0'}\n"))
+            # Posisi awal dari status aktuator (config.json / laporan board), bukan selalu mati
+            switch.setChecked(bool(Settings.actuators.value(cmd)))
+            debounce = Debounce(lambda checked, c=cmd: self.send(c, int(checked)), TOGGLE_DEBOUNCE_MS, switch)
+            switch.toggled.connect(debounce.push)
             vbox.addWidget(label)
             vbox.addWidget(switch)
             widget = QWidget()
             widget.setLayout(vbox)
             self.control_widgets.append(switch)
+            self.switches[cmd] = switch
             return widget
         layout.addWidget(create_toggle("UV Light", "U"))
         layout.addWidget(create_toggle("Indicator Light", "L"))
@@ -54,10 +64,14 @@ class Manual(QWidget):
             slider = QSlider(Qt.Horizontal)
             slider.setObjectName("device-slider")
             slider.setRange(0, 255)
+            slider.setValue(Settings.actuators.value(cmd))
             value_label = QLabel(f"{slider.value()}")
             value_label.setObjectName("slider-value-label")
             slider.valueChanged.connect(value_label.setNum)
-            slider.sliderReleased.connect(lambda c=cmd, s=slider: Settings.send_command(f"{c}{s.value()}\n"))
+            # Streaming saat digeser (dibatasi laju), nilai akhir dijamin terkirim saat dilepas
+            throttle = Throttle(lambda value, c=cmd: self.send(c, value), SLIDER_STREAM_HZ, slider)
+            slider.valueChanged.connect(throttle.push)
+            slider.sliderReleased.connect(lambda t=throttle, s=slider: t.flush(s.value()))
             hbox = QHBoxLayout()
             hbox.addWidget(slider)
             hbox.addWidget(value_label)
@@ -67,6 +81,8 @@ class Manual(QWidget):
             widget.setLayout(vbox)
             grid.addWidget(widget, row, col)
             self.control_widgets.append(slider)
+            self.sliders[cmd] = slider
+            self.slider_labels[cmd] = value_label
         create_slider("Kipas Peltier", "P", 0, 0)
         create_slider("Kipas Radiator", "R", 0, 1)
         create_slider("Peltier PWM", "D", 1, 0)
@@ -74,6 +90,26 @@ class Manual(QWidget):
         create_slider("Grow Light (Biru)", "B", 2, 0)
         main_layout.addWidget(sliders_container)
         main_layout.addStretch()
+        Settings.actuators.changed.connect(self.show_actuator_state)
+
+    def send(self, code, value):
+        """User action: send the command and keep the value as the Manual default for the next start."""
+        Settings.actuators.set_default(code, value)
+        Settings.send_command(f"{code}{value}\n")
+
+    @Slot(str, int)
+    def show_actuator_state(self, code, value):
+        """Follow the state reported by the board without sending it back."""
+        widget = self.switches.get(code) or self.sliders.get(code)
+        if widget is None or (code in self.sliders and widget.isSliderDown()):
+            return  # Slider yang sedang digeser tidak direbut
+        widget.blockSignals(True)
+        if code in self.switches:
+            widget.setChecked(bool(value))
+        else:
+            widget.setValue(value)
+            self.slider_labels[code].setNum(value)
+        widget.blockSignals(False)
     @Slot(bool)
     def set_controls_enabled(self, enabled):
         for widget in self.control_widgets:
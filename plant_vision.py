@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+import cv2
+import numpy as np
+
+log = logging.getLogger("vision")
+
+CANOPY_CHANNELS = ("green_coverage", "plant_coverage", "yellow_ratio", "mean_hue", "leaf_area_cm2")
+ANALYSIS_WIDTH = 320  # Piksel; analisis memakai salinan kecil, bukan frame penuh
+# Rentang HSV OpenCV (H 0..179): daun sehat hijau, daun menguning kuning-hijau
+GREEN_LOW, GREEN_HIGH = np.array([35, 40, 40], np.uint8), np.array([85, 255, 255], np.uint8)
+YELLOW_LOW, YELLOW_HIGH = np.array([18, 60, 60], np.uint8), np.array([34, 255, 255], np.uint8)
+_OPEN_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+def analyze_canopy(frame, field_area_cm2=0.0):
+    """Canopy metrics for a BGR frame, computed with whole-image OpenCV ops.
+
+    green_coverage / plant_coverage are fractions of the frame; yellow_ratio is the yellow
+    share of plant pixels (rises as leaves yellow); mean_hue is the average hue of plant
+    pixels; leaf_area_cm2 scales plant_coverage by the configured field of view (NaN if unset).
+    """
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    # Opening membuang bintik noise agar tidak terhitung sebagai daun
+    green = cv2.morphologyEx(cv2.inRange(hsv, GREEN_LOW, GREEN_HIGH), cv2.MORPH_OPEN, _OPEN_KERNEL)
+    yellow = cv2.morphologyEx(cv2.inRange(hsv, YELLOW_LOW, YELLOW_HIGH), cv2.MORPH_OPEN, _OPEN_KERNEL)
+    plant = cv2.bitwise_or(green, yellow)
+    total = plant.shape[0] * plant.shape[1]
+    plant_px = cv2.countNonZero(plant)
+    plant_coverage = plant_px / total
+    return {
+        "green_coverage": cv2.countNonZero(green) / total,
+        "plant_coverage": plant_coverage,
+        "yellow_ratio": cv2.countNonZero(yellow) / plant_px if plant_px else 0.0,
+        "mean_hue": cv2.mean(hsv, mask=plant)[0] if plant_px else float("nan"),
+        "leaf_area_cm2": plant_coverage * field_area_cm2 if field_area_cm2 else float("nan"),
+    }
+
+
+class CanopyAnalyzer:
+    """Runs analyze_canopy for one camera on its own thread, at most once every `interval` seconds.
+
+    offer() is called from the capture thread: when a measurement is due and the analyzer is
+    idle it stores a downscaled copy and returns; otherwise the frame is ignored. Results go to
+    `callback(metrics)` on the analyzer thread.
+    """
+    def __init__(self, callback, interval=5.0, field_area_cm2=0.0, width=ANALYSIS_WIDTH):
+        self.callback = callback
+        self.interval = interval
+        self.field_area_cm2 = field_area_cm2
+        self.width = width
+        self._last = 0.0
+        self._frame = None
+        self._wakeup = threading.Event()
+        self._running = True
+        self._thread = None
+
+    def offer(self, frame):
+        now = time.monotonic()
+        if not self.interval or self._frame is not None or now - self._last < self.interval:
+            return
+        self._last = now
+        h, w = frame.shape[:2]
+        if w > self.width:
+            frame = cv2.resize(frame, (self.width, h * self.width // w), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        self._frame = frame
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="canopy-analyzer", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def close(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._running:
+                return
+            frame = self._frame
+            if frame is None:
+                continue
+            try:
+                metrics = analyze_canopy(frame, self.field_area_cm2)
+            except cv2.error as e:
+                log.error("Analisis kanopi gagal: %s", e)
+            else:
+                self.callback(metrics)
+            finally:
+                self._frame = None
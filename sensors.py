@@ -1,19 +1,57 @@
-import json
+import logging
 import random
 import time
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout, QFrame
 )
-from PySide6.QtCore import Qt, Slot, QTimer
+from PySide6.QtCore import Qt, Slot, QTimer, Signal
 from gauges import HalfCircleGauge, StripGauge
 from settings import Settings
 from slide_switch import SlideSwitch
+from ui_scheduler import FrameScheduler
+
+log = logging.getLogger("sensors")
 
 
 DEBUG_GAUGE = True  # Set True to test gauge with random data
+SERIAL_SOURCE = "ext"  # Sumber riwayat sampel board serial (gauge External)
+
+# Ambang perubahan "berarti" per kanal, dipakai untuk menyesuaikan laju sampling
+SIGNIFICANT_CHANGE = {"temp": 0.2, "hum": 1.0, "lux": 50, "co2": 50, "tvoc": 20}
+
+
+class AdaptiveRate:
+    """Sampling interval that shrinks while values move or a control action is in flight, and grows while stable."""
+    def __init__(self, min_ms=250, max_ms=5000, initial_ms=2000, control_window_s=10.0):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.interval_ms = initial_ms
+        self.control_window_s = control_window_s
+        self._last_sample = None
+
+    def update(self, sample):
+        """Feed a new sample; returns the recommended interval in ms."""
+        change = 0.0
+        if self._last_sample is not None:
+            for key, threshold in SIGNIFICANT_CHANGE.items():
+                if key in sample and key in self._last_sample:
+                    try:
+                        change = max(change, abs(float(sample[key]) - float(self._last_sample[key])) / threshold)
+                    except (TypeError, ValueError):
+                        pass
+        self._last_sample = sample
+        if time.monotonic() - Settings.last_command_time < self.control_window_s:
+            self.interval_ms = self.min_ms
+        elif change >= 1.0:
+            self.interval_ms = max(self.min_ms, self.interval_ms // 2)
+        elif change < 0.25:
+            self.interval_ms = min(self.max_ms, int(self.interval_ms * 1.25))
+        return self.interval_ms
 
 
 class Sensors(QWidget):
+    sample_processed = Signal(str, dict)  # (sumber riwayat, sampel) setiap sampel board serial (untuk kontrol iklim)
+
     def __init__(self, dashboard_widget=None):
         super().__init__()
         self.setObjectName("sensors-container")
@@ -42,10 +80,16 @@ class Sensors(QWidget):
         main_layout.addWidget(self.main_content, 2)
         main_layout.addStretch()
 
-        # Timer polling data sensor
+        # Timer polling data sensor (fallback jika board tidak mendukung streaming 'S<ms>')
+        self._sensor_request_id = None
+        self._stream_request_id = None
+        self._streaming = False
+        self._stream_interval_ms = 0
+        self._last_frame_time = 0.0
+        self.sample_rate = AdaptiveRate()
         self.serial_read_timer = QTimer(self)
         self.serial_read_timer.timeout.connect(self.request_and_update_sensors)
-        self.serial_read_timer.start(2000)
+        self.serial_read_timer.start(self.sample_rate.interval_ms)
         # Debug gauge timer
         if DEBUG_GAUGE:
             self.debug_timer = QTimer(self)
@@ -56,30 +100,92 @@ class Sensors(QWidget):
         self.set_controls_enabled(True)
 
     def request_and_update_sensors(self):
-        """Kirim perintah baca sensor ke serial jika terkoneksi."""
-        if Settings.is_connected():
-            Settings.send_command('S\n')
-            QTimer.singleShot(100, self.read_and_process_data)
-
-    def read_and_process_data(self):
-        """Baca data sensor dari serial dan update gauge jika format JSON."""
-        line = Settings.read_data()
-        if line:
-            try:
-                if line.strip().startswith("{") and line.strip().endswith("}"):
-
-                    sensor_data = json.loads(line)
-                    self.update_gauges_from_dict(sensor_data)
-            except json.JSONDecodeError:
-                pass
+        """Kirim request baca sensor jika terkoneksi; maksimal satu request 'S' menunggu balasan."""
+        if not Settings.is_connected():
+            self._sensor_request_id = None
+            return
+        if self._streaming:
+            # Watchdog: stream berhenti -> kembali ke polling dan coba aktifkan stream lagi
+            if time.monotonic() - self._last_frame_time > 3 * self._stream_interval_ms / 1000 + 1:
+                log.warning("Stream sensor berhenti, kembali ke polling.")
+                self._streaming = False
+                self.start_streaming()
+            return
+        if self._sensor_request_id is None:
+            self._sensor_request_id = Settings.request('S\n')
+
+    @Slot(bool)
+    def handle_connection_changed(self, connected):
+        self._sensor_request_id = None
+        self._streaming = False
+        if connected:
+            self.start_streaming()
+
+    def start_streaming(self):
+        """Minta board mengirim frame sensor terus-menerus; tanpa balasan 'OK S<ms>' tetap polling."""
+        self._stream_interval_ms = self.sample_rate.interval_ms
+        self._stream_request_id = Settings.request(f"S{self._stream_interval_ms}\n", expect="line", prefix="OK S")
+
+    @Slot(dict)
+    def handle_sensor_frame(self, sensor_data):
+        """Frame sensor tanpa request (mode streaming)."""
+        self._last_frame_time = time.monotonic()
+        self._process_sample(sensor_data)
+
+    @Slot(int, dict)
+    def handle_sensor_response(self, request_id, sensor_data):
+        """Balasan untuk request 'S' atau 'S<ms>' (dicocokkan oleh serial worker)."""
+        if request_id == self._stream_request_id:
+            self._stream_request_id = None
+            self._streaming = True
+            self._last_frame_time = time.monotonic()
+            log.info("Success: streaming sensor aktif (%d ms).", self._stream_interval_ms)
+            return
+        if request_id != self._sensor_request_id:
+            return
+        self._sensor_request_id = None
+        self._process_sample(sensor_data)
+
+    @Slot(int, str)
+    def handle_sensor_request_failed(self, request_id, message):
+        if request_id == self._stream_request_id:
+            self._stream_request_id = None
+            log.info("Streaming tidak didukung board, memakai polling.")
+            return
+        if request_id != self._sensor_request_id:
+            return
+        self._sensor_request_id = None
+        log.warning("%s", message)
+
+    def _process_sample(self, sensor_data):
+        self.show_sample(sensor_data)
+        self.sample_processed.emit(SERIAL_SOURCE, sensor_data)
+        if self.dashboard_widget:
+            self.dashboard_widget.update_sensor_data(
+                sensor_data.get("temp"), sensor_data.get("hum"), sensor_data.get("lux"),
+                sensor_data.get("co2"), sensor_data.get("tvoc"), source=SERIAL_SOURCE
+            )
+        interval_ms = self.sample_rate.update(sensor_data)
+        if self._streaming:
+            # Kirim laju baru hanya jika berubah cukup jauh, agar tidak membanjiri port
+            if abs(interval_ms - self._stream_interval_ms) >= self._stream_interval_ms // 4:
+                self._stream_interval_ms = interval_ms
+                Settings.send_command(f"S{interval_ms}\n")
+        elif interval_ms != self.serial_read_timer.interval():
+            self.serial_read_timer.setInterval(interval_ms)
 
     @Slot(bool)
     def set_controls_enabled(self, enabled):
         """Aktifkan/nonaktifkan semua kontrol perangkat."""
-        print(f"[DEVICES] Mengatur semua kontrol ke status: {'Aktif' if enabled else 'Nonaktif'}")
+        log.info("Mengatur semua kontrol ke status: %s", "Aktif" if enabled else "Nonaktif")
         for widget in self.control_widgets:
             widget.setEnabled(enabled)
 
+    def show_sample(self, sensor_data, is_internal=False):
+        """Coalesced gauge update: the latest value per channel is applied on the next UI refresh tick."""
+        FrameScheduler.merge(("gauges", is_internal), self,
+                             lambda data: self.update_gauges_from_dict(data, is_internal), sensor_data)
+
     def update_gauges_from_dict(self, sensor_data, is_internal=False):
         """Update sensor gauges from dict. If is_internal=True, update internal sensors, else external."""
         if is_internal:
@@ -251,26 +357,8 @@ class Sensors(QWidget):
             "hum": random.uniform(30, 80),
             "lux": random.randint(0, 2000)
         }
-        # Set external gauges
-        self.external_temp_gauge.setTemperature(ext_data["temp"])
-        self.ext_co2_gauge.setValue(ext_data["co2"] // 20)
-        self.ext_co2_value_label.setText(f"{ext_data['co2']} ppm")
-        self.ext_tvoc_gauge.setValue(min(ext_data["tvoc"] // 10, 100))
-        self.ext_tvoc_value_label.setText(f"{ext_data['tvoc']} ppb")
-        self.ext_hum_gauge.setValue(int(ext_data["hum"]))
-        self.ext_hum_value_label.setText(f"{ext_data['hum']:.1f}%")
-        self.ext_lux_gauge.setValue(min(int(ext_data["lux"]) // 20, 100))
-        self.ext_lux_value_label.setText(f"{int(ext_data['lux'])} lux")
-        # Set internal gauges
-        self.internal_temp_gauge.setTemperature(int_data["temp"])
-        self.int_co2_gauge.setValue(int_data["co2"] // 20)
-        self.int_co2_value_label.setText(f"{int_data['co2']} ppm")
-        self.int_tvoc_gauge.setValue(min(int_data["tvoc"] // 10, 100))
-        self.int_tvoc_value_label.setText(f"{int_data['tvoc']} ppb")
-        self.int_hum_gauge.setValue(int(int_data["hum"]))
-        self.int_hum_value_label.setText(f"{int_data['hum']:.1f}%")
-        self.int_lux_gauge.setValue(min(int(int_data["lux"]) // 20, 100))
-        self.int_lux_value_label.setText(f"{int(int_data['lux'])} lux")
+        self.show_sample(ext_data)
+        self.show_sample(int_data, is_internal=True)
         # Also update dashboard graph if available, with the external values
         if self.dashboard_widget:
             self.dashboard_widget.update_sensor_data(
@@ -279,5 +367,6 @@ class Sensors(QWidget):
                 ext_data["lux"],
                 ext_data["co2"],
                 ext_data["tvoc"],
-                timestamp=now
+                timestamp=now,
+                persist=False
             )
@@ -0,0 +1,213 @@
+import binascii
+import json
+import struct
+import threading
+import time
+from collections import deque
+
+# Frame biner (little-endian):
+#   A5 5A | len:u8 | seq:u16 | payload[len] | crc:u16
+# CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) dihitung atas len + seq + payload.
+SYNC = b"\xA5\x5A"
+HEADER = struct.Struct("<2sBH")
+CRC = struct.Struct("<H")
+SENSOR_PAYLOAD = struct.Struct("<fffHH")
+SENSOR_FIELDS = ("temp", "hum", "lux", "co2", "tvoc")
+BINARY_REQUEST = "F1\n"
+BINARY_ACK = "OK F1"
+TEXT_ACK = "OK F0"
+MAX_LINE_LENGTH = 1024  # Buang buffer jika noise tidak pernah mengirim '\n'
+# Perintah aktuator "<kode><nilai>\n": slider PWM 0..255 dan toggle 0/1 (lihat config.json)
+ACTUATOR_COMMANDS = ("P", "R", "D", "G", "B", "U", "L", "H", "W", "AC")
+# Satu write tidak boleh melebihi ring RX Arduino (64 byte); processSerialCommands membaca satu baris
+# (maks 99 byte) per loop, jadi baris berikutnya menunggu di ring tersebut
+MAX_BATCH_BYTES = 64
+MIN_WRITE_INTERVAL = 0.05  # Detik antar write (maks 20 batch/detik)
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_sensor_frame(seq, sample):
+    """Build a binary sensor frame in the layout the board builds in C (see command.h)."""
+    payload = SENSOR_PAYLOAD.pack(*(sample.get(k, 0) for k in SENSOR_FIELDS))
+    body = HEADER.pack(SYNC, len(payload), seq & 0xFFFF)[2:] + payload
+    return SYNC + body + CRC.pack(crc16(body))
+
+
+def parse_actuator_command(cmd):
+    """(code, value) of an actuator command such as "G128\n", or None for anything else."""
+    cmd = cmd.strip()
+    for code in sorted(ACTUATOR_COMMANDS, key=len, reverse=True):
+        if cmd.startswith(code) and cmd[len(code):].isdigit():
+            return code, int(cmd[len(code):])
+    return None
+
+
+class FrameDecoder:
+    """Incremental decoder for the serial byte stream.
+
+    In text mode every '\\n'-terminated line is an event. After the board acks
+    binary framing with "OK F1" sensor samples arrive as CRC-checked frames,
+    while acknowledgements stay text lines ("OK F0" switches back).
+    feed() returns a list of ("line", str) and ("frame", dict) events.
+    """
+    def __init__(self):
+        self.binary = False
+        self.crc_errors = 0
+        self.dropped_frames = 0
+        self._last_seq = None
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        self._buffer.extend(chunk)
+        events = []
+        while self._decode_next(events):
+            pass
+        return events
+
+    def _decode_next(self, events):
+        """Decode one line or frame from the buffer; returns False when more bytes are needed."""
+        buf = self._buffer
+        newline_at = buf.find(b"\n")
+        sync_at = buf.find(SYNC) if self.binary else -1
+        if newline_at != -1 and (sync_at == -1 or newline_at < sync_at):
+            self._text_event(buf[:newline_at], events)
+            del buf[:newline_at + 1]
+            return True
+        if sync_at == -1:
+            if len(buf) > MAX_LINE_LENGTH:
+                del buf[:-MAX_LINE_LENGTH]
+            return False
+        # Byte sebelum sync tanpa '\n' adalah noise
+        del buf[:sync_at]
+        if len(buf) < HEADER.size:
+            return False
+        _, length, seq = HEADER.unpack_from(buf)
+        total = HEADER.size + length + CRC.size
+        if length == SENSOR_PAYLOAD.size and len(buf) < total:
+            return False
+        if length != SENSOR_PAYLOAD.size or CRC.unpack_from(buf, HEADER.size + length)[0] != crc16(bytes(buf[2:HEADER.size + length])):
+            # Frame rusak: hitung lalu sinkron ulang mulai byte berikutnya
+            self.crc_errors += 1
+            del buf[:1]
+            return True
+        body = bytes(buf[2:HEADER.size + length])
+        del buf[:total]
+        if self._last_seq is not None and seq != 0:
+            gap = (seq - self._last_seq) & 0xFFFF
+            # seq sama/mundur (kirim ulang, board reset) = sinkron ulang, bukan frame hilang
+            if 0 < gap < 0x8000:
+                self.dropped_frames += gap - 1
+        self._last_seq = seq
+        frame = dict(zip(SENSOR_FIELDS, SENSOR_PAYLOAD.unpack_from(body, HEADER.size - 2)))
+        frame["seq"] = seq
+        events.append(("frame", frame))
+        return True
+
+    def _text_event(self, raw, events):
+        line = bytes(raw).decode("utf-8", errors="ignore").strip()
+        if not line:
+            return
+        if line == BINARY_ACK:
+            self.binary = True
+            self._last_seq = None
+        elif line == TEXT_ACK:
+            self.binary = False
+        events.append(("line", line))
+        if line.startswith("{") and line.endswith("}"):
+            try:
+                frame = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            if isinstance(frame, dict):
+                events.append(("frame", frame))
+
+
+class CommandQueue:
+    """Outbound command queue between the GUI/controller threads and the serial worker.
+
+    Actuator commands are keyed by their code: a value equal to the one last written is
+    dropped, and a newer value replaces one that is still waiting (latest wins). Other
+    commands (S, F1, Q and request retries) are kept in order. take() joins waiting lines into
+    one write of at most max_batch bytes and returns nothing until min_interval has passed
+    since the last one, so requests and actuator commands share one write budget.
+    """
+    def __init__(self, max_batch=MAX_BATCH_BYTES, min_interval=MIN_WRITE_INTERVAL):
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.applied = {}  # kode -> nilai terakhir yang benar-benar ditulis
+        self.dropped = 0
+        self.coalesced = 0
+        self._actuators = {}  # kode -> baris yang menunggu (urutan sisip dipertahankan)
+        self._other = deque()  # (baris, request atau None)
+        self._last_write = float("-inf")
+        self._lock = threading.Lock()
+
+    def put(self, cmd, request=None):
+        """Queue one '\n'-terminated command; returns False if it was dropped as redundant.
+
+        request (e.g. a SerialRequest) is handed back by take() in the batch that writes the line.
+        """
+        line = cmd if cmd.endswith("\n") else cmd + "\n"
+        parsed = parse_actuator_command(line) if request is None else None
+        with self._lock:
+            if parsed is None:
+                self._other.append((line, request))
+                return True
+            code, value = parsed
+            if code in self._actuators:
+                del self._actuators[code]
+                self.coalesced += 1
+            if self.applied.get(code) == value:
+                self.dropped += 1  # Nilai sudah berlaku (perubahan bolak-balik yang belum terkirim ikut batal)
+                return False
+            self._actuators[code] = line
+            return True
+
+    def take(self, now):
+        """Next batch as (bytes, requests written, [(code, value) written]), or None if nothing is
+        waiting or the rate limit has not passed yet."""
+        with self._lock:
+            if now - self._last_write < self.min_interval or not (self._other or self._actuators):
+                return None
+            batch = []
+            requests = []
+            written = []
+            size = 0
+            while self._other and (not batch or size + len(self._other[0][0]) <= self.max_batch):
+                line, request = self._other.popleft()
+                batch.append(line)
+                size += len(line)
+                if request is not None:
+                    requests.append(request)
+            for code, line in list(self._actuators.items()):
+                if batch and size + len(line) > self.max_batch:
+                    break
+                del self._actuators[code]
+                value = parse_actuator_command(line)[1]
+                self.applied[code] = value
+                written.append((code, value))
+                batch.append(line)
+                size += len(line)
+            self._last_write = now
+            return "".join(batch).encode("utf-8"), requests, written
+
+    def drain(self):
+        """Every waiting command as take() batches, without waiting for the rate limit (shutdown)."""
+        batches = []
+        while self.pending():
+            with self._lock:
+                self._last_write = float("-inf")
+            batches.append(self.take(time.monotonic()))
+        return batches
+
+    def confirm(self, states):
+        """Values the board reports as applied ({code: value}); later equal commands are dropped."""
+        with self._lock:
+            self.applied.update(states)
+
+    def pending(self):
+        with self._lock:
+            return len(self._other) + len(self._actuators)
@@ -0,0 +1,184 @@
+import itertools
+import queue
+import threading
+import time
+import serial
+from PySide6.QtCore import QObject, Signal
+from serial_protocol import FrameDecoder, CommandQueue, BINARY_REQUEST, BINARY_ACK
+
+READ_TIMEOUT = 0.05  # Detik; batas blokir read agar antrian tulis tetap dilayani
+REQUEST_TIMEOUT = 0.5  # Detik menunggu balasan sebelum kirim ulang
+REQUEST_RETRIES = 2
+
+
+class SerialRequest:
+    """Outstanding command waiting for its reply ("frame" = JSON dict, "line" = text, optionally by prefix)."""
+    def __init__(self, request_id, command, expect="frame", prefix=None, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES):
+        self.request_id = request_id
+        self.command = command
+        self.expect = expect
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retries = retries
+        self.attempts = 0
+        self.deadline = 0.0
+
+    def matches(self, kind, line):
+        if kind != self.expect:
+            return False
+        return self.prefix is None or line.startswith(self.prefix)
+
+
+class SerialWorker(QObject):
+    """Owns the serial handle on its own thread: frames incoming lines and writes queued commands."""
+    line_received = Signal(str)
+    frame_received = Signal(dict)  # Frame tanpa request yang menunggu (unsolicited)
+    response_received = Signal(int, dict)  # (request_id, payload); balasan "line" dibungkus {"line": ...}
+    request_failed = Signal(int, str)
+    frame_errors = Signal(int, int)  # (total crc_errors, total dropped_frames) saat bertambah
+    actuators_written = Signal(float, list)  # (time.time(), [(kode, nilai)]) yang benar-benar ditulis ke port
+    connection_lost = Signal(str)
+
+    def __init__(self, ser):
+        super().__init__()
+        self.ser = ser
+        self.ser.timeout = READ_TIMEOUT
+        self.commands = CommandQueue()
+        self._request_queue = queue.Queue()
+        self._pending = []  # Urut kirim; balasan dicocokkan FIFO per jenis
+        self._stale = []  # [request, sisa balasan terlambat, kedaluwarsa] dari pengiriman ulang
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        self.decoder = FrameDecoder()
+        self._is_running = False
+
+    def run(self):
+        self._is_running = True
+        try:
+            self.ser.reset_input_buffer()
+            while self._is_running:
+                self._send_requests()
+                self._check_timeouts()
+                self._write_pending()
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+                if chunk:
+                    self._feed(chunk)
+        except (serial.SerialException, OSError) as e:
+            if self._is_running:
+                self.connection_lost.emit(str(e))
+        finally:
+            self._is_running = False
+            if self.ser.is_open:
+                self._drain_commands()
+                self.ser.close()
+
+    def send(self, command: str):
+        """Non-blocking: queue a command line; returns False if it was dropped as redundant."""
+        return self.commands.put(command)
+
+    def request(self, command: str, expect="frame", prefix=None, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES):
+        """Non-blocking: queue a command whose reply is delivered via response_received; returns the request id."""
+        with self._ids_lock:
+            request_id = next(self._ids)
+        self._request_queue.put(SerialRequest(request_id, command, expect, prefix, timeout, retries))
+        return request_id
+
+    def request_binary_framing(self):
+        """Ask the board for binary sensor frames; without an "OK F1" ack the JSON path stays active."""
+        return self.request(BINARY_REQUEST, expect="line", prefix=BINARY_ACK, retries=1)
+
+    def stop(self):
+        self._is_running = False
+
+    def _write_pending(self):
+        # Satu batch per interval (perintah dan request berbagi anggaran); sisanya menunggu putaran berikutnya
+        batch = self.commands.take(time.monotonic())
+        if batch:
+            self._write_batch(*batch)
+
+    def _write_batch(self, data, requests, written):
+        self.ser.write(data)
+        now = time.monotonic()
+        for req in requests:
+            req.deadline = now + req.timeout  # Timeout balasan dihitung sejak benar-benar terkirim
+        if written:
+            self.actuators_written.emit(time.time(), written)
+
+    def _drain_commands(self):
+        """Write what is still queued (e.g. actuators switched off on exit) before the port closes."""
+        try:
+            for i, batch in enumerate(self.commands.drain()):
+                if i:
+                    time.sleep(self.commands.min_interval)  # Ring RX board tetap tidak meluap
+                self._write_batch(*batch)
+            self.ser.flush()
+        except (serial.SerialException, OSError):
+            pass  # Port sudah hilang; tidak ada yang bisa dikirim lagi
+
+    def _send_requests(self):
+        while True:
+            try:
+                req = self._request_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._transmit(req)
+            self._pending.append(req)
+
+    def _transmit(self, req):
+        """Queue (re)transmission of req; its deadline starts when the batch is written."""
+        req.attempts += 1
+        req.deadline = float("inf")
+        self.commands.put(req.command, req)
+
+    def _check_timeouts(self):
+        if not self._pending:
+            return
+        now = time.monotonic()
+        for req in [r for r in self._pending if r.deadline <= now]:
+            if req.attempts <= req.retries:
+                self._transmit(req)
+            else:
+                self._pending.remove(req)
+                self._expect_late(req, req.attempts)
+                self.request_failed.emit(req.request_id, f"Tidak ada balasan untuk '{req.command.strip()}' setelah {req.attempts} percobaan")
+
+    def _expect_late(self, req, count):
+        """Replies to earlier transmissions of req may still arrive; they must not count as new data."""
+        if count > 0:
+            self._stale.append([req, count, time.monotonic() + req.timeout])
+
+    def _drop_late(self, kind, line):
+        """True if the reply belongs to a request that was already resolved or gave up (dropped)."""
+        now = time.monotonic()
+        self._stale = [s for s in self._stale if s[2] > now]
+        for stale in self._stale:
+            if stale[0].matches(kind, line):
+                stale[1] -= 1
+                if not stale[1]:
+                    self._stale.remove(stale)
+                return True
+        return False
+
+    def _resolve(self, kind, line, payload):
+        """Deliver a reply to the oldest matching request; returns False if nobody was waiting."""
+        if self._drop_late(kind, line):
+            return True
+        for req in self._pending:
+            if req.matches(kind, line):
+                self._pending.remove(req)
+                self._expect_late(req, req.attempts - 1)
+                self.response_received.emit(req.request_id, payload)
+                return True
+        return False
+
+    def _feed(self, chunk):
+        errors = (self.decoder.crc_errors, self.decoder.dropped_frames)
+        for kind, payload in self.decoder.feed(chunk):
+            if kind == "line":
+                self.line_received.emit(payload)
+                if not payload.startswith("{"):
+                    self._resolve("line", payload, {"line": payload})
+            elif not self._resolve("frame", "", payload):
+                self.frame_received.emit(payload)
+        if (self.decoder.crc_errors, self.decoder.dropped_frames) != errors:
+            self.frame_errors.emit(self.decoder.crc_errors, self.decoder.dropped_frames)
@@ -1,7 +1,18 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
 import serial
 import serial.tools.list_ports
-from PySide6.QtCore import Qt, Signal, QTimer, QRect, QEasingCurve, QPropertyAnimation
-from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QFrame
+from PySide6.QtCore import Qt, Signal, QTimer, QRect, QEasingCurve, QPropertyAnimation, QThread
+from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QFrame, QFileDialog
+from serial_worker import SerialWorker
+from serial_protocol import ACTUATOR_COMMANDS, parse_actuator_command
+from history_export import ACTUATOR_SOURCE, EXPORT_FORMATS, export_history
+from actuator_state import ActuatorState
+
+log = logging.getLogger("serial")
 
 class Notification(QFrame):
     def __init__(self, parent=None):
@@ -29,8 +40,16 @@ class Notification(QFrame):
         self.animation.setStartValue(start_pos); self.animation.setEndValue(end_pos); self.animation.finished.connect(self.hide); self.animation.start()
 
 class Settings(QWidget):
-    ser = None
+    worker = None
+    serial_thread = None
+    last_command_time = 0.0  # time.monotonic() perintah aktuator terakhir
+    history = None  # history_store.SampleLog; perintah aktuator dicatat sebagai sumber "actuators"
+    actuators = None  # ActuatorState: nilai yang diinginkan vs yang dilaporkan board
     connection_changed = Signal(bool)
+    export_finished = Signal(str, str)  # level, pesan
+    frame_received = Signal(dict)
+    response_received = Signal(int, dict)
+    request_failed = Signal(int, str)
 
     def __init__(self):
         super().__init__()
@@ -42,13 +61,26 @@ class Settings(QWidget):
         self.refresh_btn = QPushButton("Refresh"); serial_layout.addWidget(self.refresh_btn)
         self.connect_btn = QPushButton("Connect"); self.connect_btn.setObjectName("connect-btn"); serial_layout.addWidget(self.connect_btn)
         layout.addWidget(serial_container)
+        export_container = QWidget(); export_container.setObjectName("export-container"); export_container.setMaximumWidth(600)
+        export_layout = QHBoxLayout(export_container); export_layout.addWidget(QLabel("Ekspor Riwayat:"))
+        self.export_combo = QComboBox(); self.export_combo.addItems([fmt.upper() for fmt in EXPORT_FORMATS]); export_layout.addWidget(self.export_combo, 1)
+        self.export_btn = QPushButton("Ekspor"); export_layout.addWidget(self.export_btn)
+        layout.addWidget(export_container)
+        self.export_btn.clicked.connect(self.export_history)
+        self.export_finished.connect(self.handle_export_finished)
         self.refresh_btn.clicked.connect(self.refresh_serial_ports)
         self.connect_btn.clicked.connect(self.toggle_connection)
+        self._framing_request_id = None
+        self.response_received.connect(self.handle_framing_response)
+        self.request_failed.connect(self.handle_framing_failed)
         self.notification_popup = Notification(self.window())
+        Settings.actuators = ActuatorState(Settings.send_command, Settings.request)
+        self.response_received.connect(Settings.actuators.handle_response)
+        self.request_failed.connect(Settings.actuators.handle_failed)
         self.refresh_serial_ports()
 
     def toggle_connection(self):
-        if Settings.ser and Settings.ser.is_open:
+        if Settings.is_connected():
             self.disconnect_serial_port()
         else:
             self.connect_serial_port()
@@ -59,22 +91,93 @@ class Settings(QWidget):
             self.notification_popup.show_notification("Tidak ada port serial yang dipilih.", "error")
             return
         try:
-            print(f"Mencoba menghubungkan ke {port}...")
-            Settings.ser = serial.Serial(port, 115200, timeout=1)
-            print(f"Berhasil terhubung ke {port}")
-            self.notification_popup.show_notification(f"Berhasil terhubung ke {port}", "success")
-            self.connect_btn.setText("Disconnect"); self.connect_btn.setStyleSheet("background-color: #c0392b;")
-            self.connection_changed.emit(True)
+            log.info("Mencoba menghubungkan ke %s...", port)
+            ser = serial.Serial(port, 115200, timeout=1)
         except serial.SerialException as e:
-            print(f"Gagal terhubung: {e}"); self.notification_popup.show_notification(f"Gagal terhubung: {e}", "error")
-            Settings.ser = None; self.connection_changed.emit(False)
+            log.error("Gagal terhubung: %s", e); self.notification_popup.show_notification(f"Gagal terhubung: {e}", "error")
+            self.connection_changed.emit(False)
+            return
+        # Handle serial diserahkan ke worker; semua I/O berjalan di thread terpisah
+        Settings.serial_thread = QThread()
+        Settings.worker = SerialWorker(ser)
+        Settings.worker.moveToThread(Settings.serial_thread)
+        Settings.serial_thread.started.connect(Settings.worker.run)
+        Settings.worker.line_received.connect(self.log_received_line)
+        Settings.worker.frame_received.connect(self.frame_received)
+        Settings.worker.response_received.connect(self.response_received)
+        Settings.worker.request_failed.connect(self.request_failed)
+        Settings.worker.frame_errors.connect(self.log_frame_errors)
+        # Riwayat aktuator dicatat saat benar-benar ditulis, bukan saat diantrikan (bisa digabung/dibuang)
+        Settings.worker.actuators_written.connect(Settings.record_actuators, Qt.DirectConnection)
+        Settings.worker.connection_lost.connect(self.handle_connection_lost)
+        Settings.worker.line_received.connect(Settings.actuators.handle_line)
+        Settings.serial_thread.start()
+        # Negosiasi frame biner; board lama tidak membalas dan tetap memakai JSON
+        self._framing_request_id = Settings.worker.request_binary_framing()
+        # Status aktuator dibaca sekali dari board; hanya yang berbeda yang dikirim ulang
+        Settings.actuators.attach(Settings.worker)
+        log.info("Success: berhasil terhubung ke %s", port)
+        self.notification_popup.show_notification(f"Berhasil terhubung ke {port}", "success")
+        self.connect_btn.setText("Disconnect"); self.connect_btn.setStyleSheet("background-color: #c0392b;")
+        self.connection_changed.emit(True)
 
     def disconnect_serial_port(self):
-        if Settings.ser and Settings.ser.is_open:
-            Settings.ser.close()
-            print("Koneksi serial ditutup.")
+        if Settings.worker:
+            Settings.worker.stop()
+            Settings.serial_thread.quit(); Settings.serial_thread.wait()
+            log.info("Koneksi serial ditutup.")
+        Settings.worker = None; Settings.serial_thread = None
+        Settings.actuators.attach(None)
         self.connect_btn.setText("Connect"); self.connect_btn.setStyleSheet("")
-        self.connection_changed.emit(False); Settings.ser = None
+        self.connection_changed.emit(False)
+
+    def handle_connection_lost(self, message):
+        log.error("Error koneksi serial: %s", message)
+        self.notification_popup.show_notification(f"Koneksi serial terputus: {message}", "error")
+        self.disconnect_serial_port()
+
+    def log_received_line(self, line):
+        log.debug("Menerima: %s", line)
+
+    def handle_framing_response(self, request_id, payload):
+        if request_id == self._framing_request_id:
+            self._framing_request_id = None
+            log.info("Success: frame sensor biner aktif.")
+
+    def handle_framing_failed(self, request_id, message):
+        if request_id == self._framing_request_id:
+            self._framing_request_id = None
+            log.info("Board tidak mendukung frame biner, memakai JSON.")
+
+    def log_frame_errors(self, crc_errors, dropped_frames):
+        log.warning("Frame rusak (CRC) %d, frame hilang %d", crc_errors, dropped_frames)
+
+    def export_history(self):
+        if Settings.history is None:
+            self.notification_popup.show_notification("Riwayat belum tersedia.", "error")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Pilih folder ekspor", os.path.expanduser("~"))
+        if not out_dir:
+            return
+        fmt = EXPORT_FORMATS[self.export_combo.currentIndex()]
+        self.export_btn.setEnabled(False)
+        self.notification_popup.show_notification(f"Mengekspor riwayat ({fmt.upper()})...", "info")
+        # Streaming per chunk di thread terpisah: GUI tetap responsif berapa pun panjang riwayat
+        threading.Thread(target=self._export_worker, args=(out_dir, fmt), name="history-export", daemon=True).start()
+
+    def _export_worker(self, out_dir, fmt):
+        try:
+            Settings.history.flush()  # Sampel yang masih di antrian ikut terekspor
+            written = export_history(Settings.history, out_dir, fmt)
+        except (OSError, RuntimeError, ValueError) as e:
+            log.error("Ekspor riwayat gagal: %s", e)
+            self.export_finished.emit("error", f"Ekspor gagal: {e}")
+            return
+        self.export_finished.emit("success", f"{len(written)} file ({sum(written.values())} baris) diekspor ke {out_dir}")
+
+    def handle_export_finished(self, level, message):
+        self.export_btn.setEnabled(True)
+        self.notification_popup.show_notification(message, level, 5000)
 
     def refresh_serial_ports(self):
         self.serial_combo.clear()
@@ -84,22 +187,46 @@ class Settings(QWidget):
 
     @staticmethod
     def send_command(cmd: str):
-        if Settings.ser and Settings.ser.is_open:
-            try:
-                print(f"[SERIAL] Mengirim: {cmd.strip()}"); Settings.ser.write(cmd.encode('utf-8'))
-            except Exception as e: print(f"Error saat menulis ke serial: {e}")
-        else: print(f"[SERIAL] GAGAL: Port tidak terhubung. Perintah '{cmd.strip()}' tidak dikirim.")
+        """Non-blocking: antrikan perintah ke serial worker. Mengembalikan False jika tidak diantrikan."""
+        worker = Settings.worker  # Referensi lokal: disconnect bisa mengosongkan Settings.worker kapan saja
+        if worker is not None:
+            parsed = parse_actuator_command(cmd)
+            if parsed is not None and Settings.actuators is not None:
+                Settings.actuators.note_sent(*parsed)  # Juga jika dibuang: nilai itu yang diinginkan
+            # Antrian worker membuang nilai yang sudah berlaku dan menggabungkan update beruntun
+            if not worker.send(cmd):
+                log.debug("Dilewati (nilai sama): %s", cmd.strip())
+                return False
+            log.debug("Mengirim: %s", cmd.strip())
+            if not cmd.startswith('S'): Settings.last_command_time = time.monotonic()
+            return True
+        log.error("GAGAL: Port tidak terhubung. Perintah '%s' tidak dikirim.", cmd.strip())
+        return False
+
+    @staticmethod
+    def record_actuators(timestamp, written):
+        """Append the actuator commands of one serial write to the history as a sparse row (only the written channels are set).
+
+        Runs on the serial thread (direct connection), so commands written right before the port closes are recorded too.
+        """
+        if Settings.history is None:
+            return
+        row = np.full(len(ACTUATOR_COMMANDS) + 1, np.nan)
+        row[0] = timestamp
+        for code, value in written:
+            row[1 + ACTUATOR_COMMANDS.index(code)] = value
+        Settings.history.append(ACTUATOR_SOURCE, ACTUATOR_COMMANDS, row)
 
     @staticmethod
-    def read_data():
-        if Settings.ser and Settings.ser.is_open:
-            try:
-                line = Settings.ser.readline().decode('utf-8', errors='ignore').strip()
-                if line: print(f"[SERIAL] Menerima: {line}")
-                return line
-            except Exception as e: print(f"Error saat membaca dari serial: {e}")
+    def request(cmd: str, expect="frame", prefix=None):
+        """Kirim perintah yang menunggu balasan; balasan lewat response_received. Mengembalikan request id atau None."""
+        worker = Settings.worker
+        if worker is not None:
+            log.debug("Request: %s", cmd.strip())
+            return worker.request(cmd, expect, prefix)
+        log.error("GAGAL: Port tidak terhubung. Request '%s' tidak dikirim.", cmd.strip())
         return None
 
     @staticmethod
     def is_connected():
-        return Settings.ser is not None and Settings.ser.is_open
\ No newline at end of file
+        return Settings.worker is not None
@@ -0,0 +1,340 @@
+import time
+from collections import deque
+import numpy as np
+
+CHANNELS = ("temp", "hum", "lux", "co2", "tvoc")
+SOURCES = ("ext", "int")
+HISTORY_CAPACITY = 86400  # Sampel per sumber (~24 jam pada 1 Hz), batas memori tetap
+HISTORY_RETENTION = 24 * 3600  # Detik; sampel lebih tua tidak ikut di view
+DECIMATION_FACTOR = 8  # Sampel per bin di level 1; tiap level berikutnya 8x lebih kasar
+
+
+class RingBuffer:
+    """Fixed-capacity time series for one source: a time column plus one float64 column per channel.
+
+    Every sample is written twice (at i and i + capacity) so the newest n samples are always
+    one contiguous slice; view() returns NumPy views into the buffer without copying.
+    """
+    def __init__(self, capacity=HISTORY_CAPACITY, channels=CHANNELS):
+        self.capacity = capacity
+        self.channels = channels
+        self._columns = np.full((len(channels) + 1, 2 * capacity), np.nan)
+        self._index = {name: i + 1 for i, name in enumerate(channels)}
+        self._head = 0  # Posisi tulis berikutnya (mod capacity)
+        self.size = 0
+
+    def append(self, timestamp, sample):
+        """O(1): store one sample; missing channels are NaN."""
+        row = np.full(len(self.channels) + 1, np.nan)
+        row[0] = timestamp
+        for name, i in self._index.items():
+            value = sample.get(name)
+            if value is not None:
+                row[i] = value
+        self.append_row(row)
+        return row
+
+    def append_row(self, row):
+        """O(1): store a prepared [timestamp, *channels] float row."""
+        self._columns[:, self._head] = row
+        self._columns[:, self._head + self.capacity] = row
+        self._head = (self._head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _span(self, count=None):
+        count = self.size if count is None else min(count, self.size)
+        start = (self._head - count) % self.capacity
+        return start, start + count
+
+    def times(self, count=None):
+        start, stop = self._span(count)
+        return self._columns[0, start:stop]
+
+    def channel(self, name, count=None):
+        start, stop = self._span(count)
+        return self._columns[self._index[name], start:stop]
+
+    def since(self, t0):
+        """Number of newest samples with timestamp >= t0 (timestamps are appended in order)."""
+        times = self.times()
+        return len(times) - int(np.searchsorted(times, t0, side="left"))
+
+    def extend(self, rows):
+        """Bulk append of an (n, 1 + channels) array, oldest first; only the newest capacity rows are kept."""
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        if not n:
+            return
+        index = (self._head + np.arange(n)) % self.capacity
+        self._columns[:, index] = rows.T
+        self._columns[:, index + self.capacity] = rows.T
+        self._head = (self._head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def between(self, t0, t1):
+        """Number of samples with t0 <= timestamp <= t1."""
+        times = self.times()
+        return int(np.searchsorted(times, t1, side="right") - np.searchsorted(times, t0, side="left"))
+
+    def clear(self):
+        self._columns.fill(np.nan)
+        self._head = 0
+        self.size = 0
+
+
+class _MinMaxBin:
+    """Accumulates rows into one bin and emits it as two rows: each channel's extremes in time order."""
+    def __init__(self, width):
+        self.count = 0
+        self._lo = np.full(width, np.nan)
+        self._hi = np.full(width, np.nan)
+        self._lo_first = np.zeros(width, dtype=bool)
+        self._t0 = self._t1 = 0.0
+
+    def add(self, row):
+        values = row[1:]
+        if self.count == 0:
+            self._t0 = row[0]
+            self._lo[:] = values
+            self._hi[:] = values
+            self._lo_first[:] = True
+        else:
+            # NaN lama selalu diganti; NaN baru tidak pernah menang
+            lower = (values < self._lo) | (np.isnan(self._lo) & ~np.isnan(values))
+            higher = (values > self._hi) | (np.isnan(self._hi) & ~np.isnan(values))
+            self._lo[lower] = values[lower]
+            self._hi[higher] = values[higher]
+            self._lo_first[lower] = False
+            self._lo_first[higher] = True
+        self._t1 = row[0]
+        self.count += 1
+
+    def flush(self):
+        first = np.empty(len(self._lo) + 1)
+        second = np.empty(len(self._lo) + 1)
+        first[0], second[0] = self._t0, self._t1
+        first[1:] = np.where(self._lo_first, self._lo, self._hi)
+        second[1:] = np.where(self._lo_first, self._hi, self._lo)
+        self.count = 0
+        return first, second
+
+
+def _reduce_bins(rows, per_bin):
+    """Vectorized _MinMaxBin: every per_bin rows become two rows (extremes per channel in time order)."""
+    width = rows.shape[1]
+    if not len(rows):
+        return np.empty((0, width))
+    bins = rows.reshape(-1, per_bin, width)
+    values = bins[:, :, 1:]
+    lo_at = np.argmin(np.where(np.isnan(values), np.inf, values), axis=1)
+    hi_at = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+    lo = np.take_along_axis(values, lo_at[:, None, :], axis=1)[:, 0]
+    hi = np.take_along_axis(values, hi_at[:, None, :], axis=1)[:, 0]
+    lo_first = lo_at <= hi_at
+    out = np.empty((2 * len(bins), width))
+    out[0::2, 0] = bins[:, 0, 0]
+    out[1::2, 0] = bins[:, -1, 0]
+    out[0::2, 1:] = np.where(lo_first, lo, hi)
+    out[1::2, 1:] = np.where(lo_first, hi, lo)
+    return out
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max decimation of one source.
+
+    Level 0 is the raw RingBuffer; level k keeps one bin of factor**k samples as two rows
+    (the min and max of each channel), so a visible range can always be drawn from the
+    coarsest level that still has enough points for the widget width. Appends are O(1)
+    amortized since level k is only touched once every factor**k samples.
+    """
+    def __init__(self, raw, factor=DECIMATION_FACTOR, min_bins=64):
+        self.levels = [raw]
+        self._bins = []
+        self._rows_per_bin = []
+        capacity = raw.capacity
+        while capacity // factor >= min_bins:
+            capacity //= factor
+            self.levels.append(RingBuffer(2 * capacity, raw.channels))
+            self._bins.append(_MinMaxBin(len(raw.channels)))
+            # Level 1 memakan sampel mentah, level berikutnya memakan 2 baris per bin di bawahnya
+            self._rows_per_bin.append(factor if len(self._bins) == 1 else 2 * factor)
+
+    def feed(self, row):
+        """Propagate a row that was just appended to the raw level."""
+        rows = [row]
+        for level, acc, per_bin in zip(self.levels[1:], self._bins, self._rows_per_bin):
+            out = []
+            for r in rows:
+                acc.add(r)
+                if acc.count == per_bin:
+                    out.extend(acc.flush())
+            if not out:
+                return
+            for r in out:
+                level.append_row(r)
+            rows = out
+
+    def extend(self, rows):
+        """Bulk-load rows into an empty pyramid (startup restore); bins are reduced with whole-array ops."""
+        self.levels[0].extend(rows)
+        for level, acc, per_bin in zip(self.levels[1:], self._bins, self._rows_per_bin):
+            full = len(rows) // per_bin * per_bin
+            out = _reduce_bins(rows[:full], per_bin)
+            # Sisa yang belum genap satu bin masuk akumulator seperti biasa
+            for r in rows[full:]:
+                acc.add(r)
+            level.extend(out)
+            rows = out
+
+    def pick(self, t0, t1, max_points):
+        """Finest level whose rows in [t0, t1] fit in max_points (falls back to the coarsest)."""
+        for level in self.levels:
+            if level.between(t0, t1) <= max_points:
+                return level
+        return self.levels[-1]
+
+    def clear(self):
+        for level in self.levels:
+            level.clear()
+        for acc in self._bins:
+            acc.count = 0
+
+
+class TimeSeriesStore:
+    """Bounded sensor history for the external and internal sources, with a retention window in seconds.
+
+    With a sample_log (history_store.SampleLog) every appended row is also persisted, and
+    restore() reloads the retention window from disk at startup. With rollups
+    (history_query.HistoryQuery) every row also updates the coarse min/max/mean/last buckets.
+    """
+    def __init__(self, capacity=HISTORY_CAPACITY, retention=HISTORY_RETENTION, sources=SOURCES, sample_log=None,
+                 rollups=None):
+        self.retention = retention
+        self.sample_log = sample_log
+        self.rollups = rollups
+        self.buffers = {source: RingBuffer(capacity) for source in sources}
+        self.pyramids = {source: MinMaxPyramid(buf) for source, buf in self.buffers.items()}
+
+    def add_source(self, source, channels, capacity=HISTORY_CAPACITY):
+        """Register an extra source with its own channels (e.g. camera metrics); no-op if it exists."""
+        if source not in self.buffers:
+            self.buffers[source] = RingBuffer(capacity, channels)
+            self.pyramids[source] = MinMaxPyramid(self.buffers[source])
+
+    def append(self, source, sample, timestamp=None, persist=True):
+        """Add one sample; with persist=False (e.g. debug data) it stays out of the sample log and rollups."""
+        buf = self.buffers[source]
+        row = buf.append(time.time() if timestamp is None else timestamp, sample)
+        self.pyramids[source].feed(row)
+        if not persist:
+            return
+        if self.sample_log is not None:
+            self.sample_log.append(source, buf.channels, row)
+        if self.rollups is not None:
+            self.rollups.add(source, row)
+
+    def restore(self, now=None, capacity=HISTORY_CAPACITY, exclude=()):
+        """Load the retention window of every persisted source not in exclude; returns {source: rows loaded}.
+
+        Sources that are not registered yet get a buffer of capacity, which may also be a
+        callable(source) -> capacity; registered sources keep their own buffer.
+        """
+        if self.sample_log is None:
+            return {}
+        now = time.time() if now is None else now
+        loaded = {}
+        for source, channels in self.sample_log.sources().items():
+            if "@" in source or source in exclude:
+                continue  # Bucket rollup ("<source>@<resolusi>"), bukan sampel mentah
+            self.add_source(source, channels, capacity(source) if callable(capacity) else capacity)
+            if self.buffers[source].size or self.buffers[source].channels != channels:
+                continue
+            rows = self.sample_log.load(source, now - self.retention, now)
+            self.pyramids[source].extend(rows)
+            loaded[source] = rows
+        return loaded
+
+    def close(self):
+        if self.sample_log is not None:
+            self.sample_log.close()
+
+    def view(self, source, seconds=None, now=None, max_points=None):
+        """Return (times, {channel: values}) as zero-copy views over the last `seconds` (default: retention).
+
+        With max_points the rows come from the pyramid level that keeps at most that many points.
+        """
+        seconds = self.retention if seconds is None else seconds
+        now = time.time() if now is None else now
+        buf = self.buffers[source]
+        if max_points is not None:
+            buf = self.pyramids[source].pick(now - seconds, now, max_points)
+        count = buf.since(now - seconds)
+        return buf.times(count), {name: buf.channel(name, count) for name in buf.channels}
+
+    def window_start(self, source, seconds=None, now=None):
+        """Timestamp of the oldest raw sample inside the window, or None if it is empty."""
+        seconds = self.retention if seconds is None else seconds
+        now = time.time() if now is None else now
+        buf = self.buffers[source]
+        count = buf.since(now - seconds)
+        return float(buf.times(count)[0]) if count else None
+
+    def latest(self, source):
+        """Newest sample as a dict, or None if the source is still empty."""
+        buf = self.buffers[source]
+        if not buf.size:
+            return None
+        sample = {name: float(buf.channel(name, 1)[0]) for name in buf.channels}
+        sample["time"] = float(buf.times(1)[0])
+        return sample
+
+    def __len__(self):
+        return sum(buf.size for buf in self.buffers.values())
+
+
+class RunningExtrema:
+    """Sliding-window min/max over (timestamp, value) pairs using monotonic deques; O(1) amortized per sample."""
+    def __init__(self):
+        self._min = deque()
+        self._max = deque()
+
+    def push(self, timestamp, value):
+        if value is None or value != value:  # None / NaN tidak ikut
+            return
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((timestamp, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+
+    def expire(self, t0):
+        """Forget samples older than t0."""
+        while self._min and self._min[0][0] < t0:
+            self._min.popleft()
+        while self._max and self._max[0][0] < t0:
+            self._max.popleft()
+
+    def extend(self, times, values):
+        """Bulk push (startup restore): keeps only the suffix minima/maxima, computed with NumPy."""
+        keep = ~np.isnan(values)
+        times, values = times[keep], values[keep]
+        if not len(values):
+            return
+        # Elemen bertahan di deque min jika lebih kecil dari semua nilai sesudahnya (sama dengan push berurutan)
+        later_min = np.append(np.minimum.accumulate(values[::-1])[::-1][1:], np.inf)
+        later_max = np.append(np.maximum.accumulate(values[::-1])[::-1][1:], -np.inf)
+        self._min.clear()
+        self._max.clear()
+        self._min.extend(zip(times[values < later_min].tolist(), values[values < later_min].tolist()))
+        self._max.extend(zip(times[values > later_max].tolist(), values[values > later_max].tolist()))
+
+    def bounds(self):
+        """(min, max) of the window, or None when it is empty."""
+        if not self._min:
+            return None
+        return self._min[0][1], self._max[0][1]
+
+    def clear(self):
+        self._min.clear()
+        self._max.clear()
@@ -0,0 +1,116 @@
+from PySide6.QtCore import QObject, QTimer
+
+UI_REFRESH_HZ = 10  # Maksimal penerapan update tampilan per detik
+
+
+class FrameScheduler(QObject):
+    """Coalesces UI updates: only the latest update per key is applied, at most UI_REFRESH_HZ times per second.
+
+    Updates owned by a page that is not visible stay pending and are applied once it is shown.
+    """
+    _instance = None
+
+    def __init__(self, rate_hz=UI_REFRESH_HZ):
+        super().__init__()
+        self._pending = {}  # key -> [widget, callback, args]
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 / rate_hz))
+        self.timer.timeout.connect(self.flush)
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = FrameScheduler()
+        return cls._instance
+
+    @classmethod
+    def submit(cls, key, widget, callback, *args):
+        """Schedule callback(*args); replaces any update still pending under the same key."""
+        scheduler = cls.instance()
+        scheduler._pending[key] = [widget, callback, args]
+        scheduler._wake()
+
+    @classmethod
+    def merge(cls, key, widget, callback, values):
+        """Schedule callback(values) where values is merged per channel into the pending dict for key."""
+        scheduler = cls.instance()
+        entry = scheduler._pending.get(key)
+        if entry is None:
+            scheduler._pending[key] = [widget, callback, (dict(values),)]
+        else:
+            entry[2][0].update(values)
+        scheduler._wake()
+
+    def flush(self):
+        for key, (widget, callback, args) in list(self._pending.items()):
+            if widget is not None and not widget.isVisible():
+                continue
+            del self._pending[key]
+            callback(*args)
+        # Sisa update hanya milik halaman tersembunyi: tidak perlu tick sampai ada update baru atau halaman tampil
+        if all(widget is not None and not widget.isVisible() for widget, _, _ in self._pending.values()):
+            self.timer.stop()
+
+    def _wake(self):
+        if not self.timer.isActive():
+            self.timer.start()
+
+
+class Throttle(QObject):
+    """Forwards the latest pushed value to callback at most rate_hz times per second.
+
+    The first value goes out immediately; values pushed while waiting replace each other and
+    the newest one is sent when the interval ends. flush() sends a final value right away
+    (e.g. on slider release) unless it equals the last value sent.
+    """
+    _EMPTY = object()
+
+    def __init__(self, callback, rate_hz, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self._pending = self._EMPTY
+        self._last = self._EMPTY
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(int(1000 / rate_hz))
+        self.timer.timeout.connect(self._tick)
+
+    def push(self, value):
+        if self.timer.isActive():
+            self._pending = value
+        else:
+            self._emit(value)
+
+    def flush(self, value=_EMPTY):
+        if value is not self._EMPTY:
+            self._pending = value
+        self.timer.stop()
+        if self._pending is not self._EMPTY and self._pending != self._last:
+            self._emit(self._pending)
+        self._pending = self._EMPTY
+
+    def _tick(self):
+        if self._pending is not self._EMPTY:
+            self._emit(self._pending)
+
+    def _emit(self, value):
+        self._pending = self._EMPTY
+        self._last = value
+        self.timer.start()
+        self.callback(value)
+
+
+class Debounce(QObject):
+    """Calls callback with the latest pushed value once no new value arrived for delay_ms."""
+    def __init__(self, callback, delay_ms, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self._value = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(lambda: self.callback(self._value))
+
+    def push(self, value):
+        self._value = value
+        self.timer.start()